@@ -1,35 +1,136 @@
 import os
-from typing import Dict, Any
-from datetime import date
-from google.genai import types
-from google.adk.agents import Agent
-from google.adk.agents.callback_context import CallbackContext
-from google.adk.tools import VertexAiSearchTool
-import base64
-from google.adk.tools.tool_context import ToolContext
+from typing import TYPE_CHECKING, Any
+
 from .prompts import return_instructions_root
-import requests
-import google.genai.types as types
-from dotenv import load_dotenv
-import google
-import vertexai
-
-load_dotenv()
-
-credentials, project_id = google.auth.default()
-os.environ.setdefault("GOOGLE_CLOUD_PROJECT", project_id)
-os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "True")
-
-vertexai.init(project=project_id, location=os.environ.setdefault("GOOGLE_CLOUD_LOCATION", "us-central1"))
-  
-vertexAiSearchTool = VertexAiSearchTool(
-    search_engine_id = f"projects/{project_id}/locations/us/collections/default_collection/engines/linebot-search-engine"
-)
-
-root_agent = Agent(
-    name="linebot_agent",
-    model="gemini-2.5-flash",
-    description="Agent which responsible for answer the question from employee",
-    instruction=return_instructions_root(),
-    tools=[vertexAiSearchTool]
-)
\ No newline at end of file
+
+if TYPE_CHECKING:
+    from google.adk.agents import Agent
+
+    from .utils.retrieval import RetrievalCache
+    from .utils.vector_index import VectorIndex
+
+SEARCH_ENGINE_PATH = "projects/{project_id}/locations/us/collections/default_collection/engines/linebot-search-engine"
+
+
+def build_root_agent(
+    project_id: str,
+    location: str = "us-central1",
+    search_engine_id: str | None = None,
+    model: str = "gemini-2.5-flash",
+    search_cache: "RetrievalCache | None" = None,
+    local_index: "VectorIndex | None" = None,
+    local_min_score: float = 0.5,
+    history_token_budget: int | None = 8000,
+) -> "Agent":
+    """
+    Builds the LINE bot agent for a project.
+
+    The model runs on Vertex AI in ``project_id`` and ``location`` whatever the
+    GOOGLE_CLOUD_* environment variables say; the environment is not modified.
+    With a ``search_cache`` the agent searches through a cached
+    ``search_documents`` function tool instead of Gemini's built-in Vertex AI
+    Search grounding, which runs server side and cannot be cached. With a
+    ``local_index`` the agent first searches it and uses the remote search only
+    when the best local match scores below ``local_min_score``; the remote search
+    is then the function tool as well, since Gemini accepts a built-in tool only
+    as an agent's sole tool. Older turns are dropped from the prompt beyond
+    ``history_token_budget`` tokens (None keeps the whole history).
+    """
+    from google.adk.agents import Agent
+    from google.adk.tools import VertexAiSearchTool
+
+    from .utils.models import VertexAiGemini
+
+    search_engine_id = search_engine_id or SEARCH_ENGINE_PATH.format(project_id=project_id)
+    search_tool: Any
+    if search_cache is not None or local_index is not None:
+        from .utils.retrieval import VertexAiSearchRetriever
+
+        search_tool = VertexAiSearchRetriever(search_engine_id, cache=search_cache).as_tool()
+        search_tool_name = search_tool.__name__
+    else:
+        search_tool = VertexAiSearchTool(search_engine_id=search_engine_id)
+        search_tool_name = "vertexAiSearchTool"
+    tools: list[Any] = [search_tool]
+    local_search_tool_name = None
+    if local_index is not None:
+        local_search_tool = local_index.as_tool(min_score=local_min_score)
+        local_search_tool_name = local_search_tool.__name__
+        tools.insert(0, local_search_tool)
+    callbacks: dict[str, Any] = {}
+    if history_token_budget:
+        from .utils.history import HistoryCompactor
+
+        compactor = HistoryCompactor(token_budget=history_token_budget)
+        callbacks = {
+            "before_model_callback": compactor.before_model,
+            "after_model_callback": compactor.after_model,
+        }
+    return Agent(
+        name="linebot_agent",
+        model=VertexAiGemini(model=model, project=project_id, location=location),
+        description="Agent which responsible for answer the question from employee",
+        instruction=return_instructions_root(search_tool_name, local_search_tool_name),
+        tools=tools,
+        **callbacks,
+    )
+
+
+def agent_options_from_env() -> dict[str, Any]:
+    """
+    Search and history options of ``build_root_agent`` from the SEARCH_ENGINE_ID,
+    SEARCH_CACHE*, LOCAL_INDEX_* and HISTORY_TOKEN_BUDGET environment variables.
+    """
+    search_cache = None
+    if os.environ.get("SEARCH_CACHE", "off").lower() == "on":
+        from .utils.retrieval import RetrievalCache
+
+        search_cache = RetrievalCache(
+            ttl_seconds=float(os.environ.get("SEARCH_CACHE_TTL_SECONDS", "3600")),
+            max_bytes=int(os.environ.get("SEARCH_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+            path=os.environ.get("SEARCH_CACHE_PATH") or None,
+        )
+    local_index = None
+    if os.environ.get("LOCAL_INDEX_DIR"):
+        from .utils.vector_index import VectorIndex
+
+        local_index = VectorIndex.load(os.environ["LOCAL_INDEX_DIR"])
+    return {
+        "search_engine_id": os.environ.get("SEARCH_ENGINE_ID"),
+        "search_cache": search_cache,
+        "local_index": local_index,
+        "local_min_score": float(os.environ.get("LOCAL_INDEX_MIN_SCORE", "0.5")),
+        "history_token_budget": int(os.environ.get("HISTORY_TOKEN_BUDGET", "8000")) or None,
+    }
+
+
+def _build_default_root_agent() -> "Agent":
+    # configuration from .env / the environment, credentials are only looked up
+    # when no project is configured
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    project_id = os.environ.get("GOOGLE_CLOUD_PROJECT")
+    if not project_id:
+        import google.auth
+
+        _, project_id = google.auth.default()
+    if not project_id:
+        raise ValueError(
+            "No Google Cloud project: set GOOGLE_CLOUD_PROJECT or a default project."
+        )
+    return build_root_agent(
+        project_id=project_id,
+        location=os.environ.get("GOOGLE_CLOUD_LOCATION", "us-central1"),
+        **agent_options_from_env(),
+    )
+
+
+def __getattr__(name: str) -> Any:
+    # root_agent is built on first use instead of at import time
+    if name in ("root_agent", "vertexAiSearchTool"):
+        agent = globals().get("root_agent") or _build_default_root_agent()
+        globals()["root_agent"] = agent
+        globals()["vertexAiSearchTool"] = agent.tools[-1]
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -13,16 +13,19 @@
 # limitations under the License.
 
 # mypy: disable-error-code="attr-defined"
-import copy
+import asyncio
 import datetime
 import json
 import logging
 import os
-from collections.abc import Mapping, Sequence
+import threading
+from collections.abc import AsyncIterable, Iterator, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
 import google.auth
 import vertexai
+from google.adk.agents import BaseAgent
 from google.adk.artifacts import GcsArtifactService
 from google.cloud import logging as google_cloud_logging
 from opentelemetry import trace
@@ -30,31 +33,186 @@ from opentelemetry.sdk.trace import TracerProvider, export
 from vertexai import agent_engines
 from vertexai.preview.reasoning_engines import AdkApp
 
-from app.agent import root_agent
+from app.agent import agent_options_from_env, build_root_agent
+from app.utils.feedback import FeedbackAggregator, FeedbackBuffer
 from app.utils.gcs import create_bucket_if_not_exists
-from app.utils.tracing import CloudTraceLoggingSpanExporter
+from app.utils.sampling import TailSamplingSpanProcessor
+from app.utils.tracing import CloudTraceLoggingSpanExporter, LocalFileSpanExporter
 from app.utils.typing import Feedback
 
 
+def clone_agent(agent: BaseAgent) -> BaseAgent:
+    """Copies an agent tree for a new worker without deep-copying its configuration.
+
+    Model config, instructions, tools and callbacks are shared with the template;
+    each agent object and its list fields are new, so a worker changing them does
+    not affect the others.
+    """
+    update: dict[str, Any] = {
+        name: list(value) for name, value in agent if isinstance(value, list)
+    }
+    update["sub_agents"] = [clone_agent(sub_agent) for sub_agent in agent.sub_agents]
+    return agent.clone(update=update)
+
+
+async def acquire_slot(
+    slots: threading.BoundedSemaphore, executor: ThreadPoolExecutor
+) -> None:
+    """Acquires a slot of ``slots`` without blocking the event loop.
+
+    The wait runs on ``executor``, not on the loop's default executor: the query
+    holding a slot may need a default executor thread (``asyncio.to_thread``) to
+    finish, which waiting queries must not take up. The wait cannot be
+    interrupted; when the caller is cancelled meanwhile, the slot is released as
+    soon as the wait gets it.
+    """
+    acquiring = asyncio.get_running_loop().run_in_executor(executor, slots.acquire)
+    try:
+        await asyncio.shield(acquiring)
+    except asyncio.CancelledError:
+        acquiring.add_done_callback(lambda _: slots.release())
+        raise
+
+
 class AgentEngineApp(AdkApp):
     def set_up(self) -> None:
         """Set up logging and tracing for the agent engine app."""
         super().set_up()
+        self._set_up_logging()
+        self.feedback_aggregator = FeedbackAggregator(
+            window_minutes=int(os.environ.get("FEEDBACK_WINDOW_MINUTES", "60")),
+        )
+        provider = TracerProvider()
+        processor = export.BatchSpanProcessor(self._create_span_exporter())
+        # only errors, slow traces and a sample of the rest reach the exporter
+        self.sampling_processor = TailSamplingSpanProcessor(
+            processor,
+            sample_rate=float(os.environ.get("TRACE_SAMPLE_RATE", "0.1")),
+            latency_threshold_ms=float(
+                os.environ.get("TRACE_LATENCY_THRESHOLD_MS", "10000")
+            ),
+        )
+        provider.add_span_processor(self.sampling_processor)
+        trace.set_tracer_provider(provider)
+        if hasattr(os, "register_at_fork") and not getattr(
+            self, "_fork_hook_registered", False
+        ):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+            self._fork_hook_registered = True
+
+    def _set_up_logging(self) -> None:
+        """Creates the Cloud Logging client and the feedback buffer."""
         logging_client = google_cloud_logging.Client()
         self.logger = logging_client.logger(__name__)
-        provider = TracerProvider()
-        processor = export.BatchSpanProcessor(
-            CloudTraceLoggingSpanExporter(
-                project_id=os.environ.get("GOOGLE_CLOUD_PROJECT")
+        self.feedback_buffer = FeedbackBuffer(
+            self.logger,
+            max_size=int(os.environ.get("FEEDBACK_BUFFER_SIZE", "10000")),
+            batch_size=int(os.environ.get("FEEDBACK_BATCH_SIZE", "100")),
+            flush_interval=float(os.environ.get("FEEDBACK_FLUSH_SECONDS", "2")),
+        )
+
+    def _reset_after_fork(self) -> None:
+        """Rebuilds clients, threads and locks in a worker process forked after set_up.
+
+        With NUM_WORKERS > 1 the workers may be forked from a process that already
+        ran set_up; threads and open connections do not survive a fork. The tracer
+        provider is process-wide and keeps the sampling processor, which gets a
+        new exporter.
+        """
+        self._set_up_logging()
+        self.sampling_processor.delegate = export.BatchSpanProcessor(
+            self._create_span_exporter()
+        )
+        self.__dict__.pop("_query_semaphore", None)
+        self.__dict__.pop("_slot_executor", None)
+
+    def _create_span_exporter(self) -> export.SpanExporter:
+        """Creates the span exporter selected by the TRACE_EXPORTER environment variable.
+
+        ``cloud`` (default) exports to Cloud Trace, Cloud Logging and GCS; ``local``
+        writes compressed JSONL files to TRACE_LOCAL_DIR for offline analysis.
+        """
+        project_id = os.environ.get("GOOGLE_CLOUD_PROJECT")
+        if os.environ.get("TRACE_EXPORTER", "cloud") == "local":
+            return LocalFileSpanExporter(
+                directory=os.environ.get("TRACE_LOCAL_DIR", ".traces"),
+                project_id=project_id,
+                compression=os.environ.get("TRACE_LOCAL_COMPRESSION", "gzip"),
             )
+        return CloudTraceLoggingSpanExporter(
+            project_id=project_id,
+            max_batch_entries=int(os.environ.get("TRACE_LOG_MAX_BATCH_ENTRIES", "500")),
+            max_batch_bytes=int(
+                os.environ.get("TRACE_LOG_MAX_BATCH_BYTES", str(5 * 1024 * 1024))
+            ),
         )
-        provider.add_span_processor(processor)
-        trace.set_tracer_provider(provider)
+
+    def _query_slots(self) -> threading.BoundedSemaphore | None:
+        """Returns the semaphore bounding concurrent queries in this worker.
+
+        WORKER_CONCURRENCY limits how many queries a worker process runs at once;
+        0 (default) leaves them unbounded.
+        """
+        if not hasattr(self, "_query_semaphore"):
+            concurrency = int(os.environ.get("WORKER_CONCURRENCY", "0"))
+            self._query_semaphore = (
+                threading.BoundedSemaphore(concurrency) if concurrency > 0 else None
+            )
+            # async queries wait for a slot here one at a time, in arrival order
+            self._slot_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="query-slot"
+            )
+        return self._query_semaphore
+
+    def stream_query(self, **kwargs: Any) -> Iterator[dict[str, Any]]:
+        """Streams responses, waiting for a free slot when the worker is at capacity."""
+        slots = self._query_slots()
+        if slots is None:
+            yield from super().stream_query(**kwargs)
+            return
+        with slots:
+            yield from super().stream_query(**kwargs)
+
+    async def async_stream_query(self, **kwargs: Any) -> AsyncIterable[dict[str, Any]]:
+        """Async variant of ``stream_query`` sharing the same concurrency limit."""
+        slots = self._query_slots()
+        if slots is not None:
+            await acquire_slot(slots, self._slot_executor)
+        try:
+            async for event in super().async_stream_query(**kwargs):
+                yield event
+        finally:
+            if slots is not None:
+                slots.release()
 
     def register_feedback(self, feedback: dict[str, Any]) -> None:
-        """Collect and log feedback."""
+        """Collect feedback; it is logged in batches in the background."""
         feedback_obj = Feedback.model_validate(feedback)
-        self.logger.log_struct(feedback_obj.model_dump(), severity="INFO")
+        self.feedback_buffer.add(feedback_obj.model_dump())
+        self.feedback_aggregator.add(feedback_obj)
+
+    def register_feedback_batch(self, feedbacks: list[dict[str, Any]]) -> None:
+        """Collect several feedback entries, validating all of them before any is logged."""
+        feedback_objs = [Feedback.model_validate(feedback) for feedback in feedbacks]
+        for feedback_obj in feedback_objs:
+            self.feedback_buffer.add(feedback_obj.model_dump())
+            self.feedback_aggregator.add(feedback_obj)
+
+    def get_feedback_summary(
+        self, user_id: str | None = None, invocation_prefix: str | None = None
+    ) -> dict[str, Any]:
+        """Returns rolling feedback score aggregates of the worker serving the call.
+
+        Includes the stats of ``user_id`` and of the ``invocation_id`` prefix
+        ``invocation_prefix`` when given. With several worker processes or
+        replicas each call sees only one worker's share of the feedback, which
+        the response states under ``scope``; totals across workers come from
+        the feedback entries in Cloud Logging.
+        """
+        summary = self.feedback_aggregator.summary(
+            user_id=user_id, invocation_prefix=invocation_prefix
+        )
+        return {"scope": {"worker": "single", "pid": os.getpid()}, **summary}
 
     def register_operations(self) -> dict[str, list[str]]:
         """Registers the operations of the Agent.
@@ -62,14 +220,18 @@ class AgentEngineApp(AdkApp):
         Extends the base operations to include feedback registration functionality.
         """
         operations = super().register_operations()
-        operations[""] = operations[""] + ["register_feedback"]
+        operations[""] = operations[""] + [
+            "register_feedback",
+            "register_feedback_batch",
+            "get_feedback_summary",
+        ]
         return operations
 
     def clone(self) -> "AgentEngineApp":
         """Returns a clone of the ADK application."""
         template_attributes = self._tmpl_attrs
         return self.__class__(
-            agent=copy.deepcopy(template_attributes["agent"]),
+            agent=clone_agent(template_attributes["agent"]),
             enable_tracing=bool(template_attributes.get("enable_tracing", False)),
             session_service_builder=template_attributes.get("session_service_builder"),
             artifact_service_builder=template_attributes.get(
@@ -86,8 +248,16 @@ def deploy_agent_engine_app(
     requirements_file: str = ".requirements.txt",
     extra_packages: list[str] = ["./app"],
     env_vars: dict[str, str] = {},
+    num_workers: int = 1,
+    worker_concurrency: int = 4,
 ) -> agent_engines.AgentEngine:
-    """Deploy the agent engine app to Vertex AI."""
+    """Deploy the agent engine app to Vertex AI.
+
+    ``num_workers`` worker processes serve each replica, each running at most
+    ``worker_concurrency`` queries at once (0 for no limit). Explicit NUM_WORKERS
+    and WORKER_CONCURRENCY entries in ``env_vars`` take precedence.
+    """
+    env_vars = dict(env_vars)
 
     staging_bucket_uri = f"gs://{project}-agent-engine"
     artifacts_bucket_name = f"{project}-linebot-agent-logs-data"
@@ -104,15 +274,29 @@ def deploy_agent_engine_app(
     with open(requirements_file) as f:
         requirements = f.read().strip().split("\n")
 
+    # SEARCH_CACHE* and LOCAL_INDEX_* configure the deployed agent as they do a
+    # local one; the cache and index are pickled as configuration and set up
+    # again in each worker, so the index files are shipped with the code
+    local_index_dir = os.environ.get("LOCAL_INDEX_DIR")
+    if local_index_dir:
+        if os.path.isabs(local_index_dir):
+            raise ValueError(
+                "LOCAL_INDEX_DIR must be relative to the working directory to be "
+                "shipped with extra_packages."
+            )
+        extra_packages = [*extra_packages, local_index_dir]
+
     agent_engine = AgentEngineApp(
-        agent=root_agent,
+        agent=build_root_agent(
+            project_id=project, location=location, **agent_options_from_env()
+        ),
         artifact_service_builder=lambda: GcsArtifactService(
             bucket_name=artifacts_bucket_name
         ),
     )
 
-    # Set worker parallelism to 1
-    env_vars["NUM_WORKERS"] = "1"
+    env_vars.setdefault("NUM_WORKERS", str(num_workers))
+    env_vars.setdefault("WORKER_CONCURRENCY", str(worker_concurrency))
 
     # Common configuration for both create and update operations
     agent_config = {
@@ -182,6 +366,18 @@ if __name__ == "__main__":
         default=["./app"],
         help="Additional packages to include",
     )
+    parser.add_argument(
+        "--num-workers",
+        type=int,
+        default=1,
+        help="Worker processes per replica (defaults to 1)",
+    )
+    parser.add_argument(
+        "--worker-concurrency",
+        type=int,
+        default=4,
+        help="Concurrent queries per worker process, 0 for no limit (defaults to 4)",
+    )
     parser.add_argument(
         "--set-env-vars",
         help="Comma-separated list of environment variables in KEY=VALUE format",
@@ -213,4 +409,6 @@ if __name__ == "__main__":
         requirements_file=args.requirements_file,
         extra_packages=args.extra_packages,
         env_vars=env_vars,
+        num_workers=args.num_workers,
+        worker_concurrency=args.worker_concurrency,
     )
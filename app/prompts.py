@@ -5,18 +5,26 @@ These instructions guide the agent's behavior, workflow, and tool usage.
 """
 
 
-def return_instructions_root() -> str:
+def return_instructions_root(
+    search_tool_name: str = "vertexAiSearchTool",
+    local_search_tool_name: str | None = None,
+) -> str:
 
-    instruction_prompt_root_v0 = """
+    instruction_prompt_root_v0 = f"""
     You are a friendly and helpful assistant.
 
     Ensure your answers are complete, unless the user requests a more concise approach.
     
     When presented with inquiries seeking information, provide answers that reflect a deep understanding of the field, guaranteeing their correctness.
 
-    You need to call `vertexAiSearchTool` if question out of your knowledge, or you are not sure about the answer.
+    You need to call `{search_tool_name}` if question out of your knowledge, or you are not sure about the answer.
     
-    If the user asks for a specific document, you can use the `vertexAiSearchTool` to find it.
+    If the user asks for a specific document, you can use the `{search_tool_name}` to find it.
+    """
+
+    if local_search_tool_name:
+        instruction_prompt_root_v0 += f"""
+    Before using `{search_tool_name}`, call `{local_search_tool_name}` first. Use `{search_tool_name}` only when its result has `fallback` set or does not answer the question.
     """
 
     return instruction_prompt_root_v0
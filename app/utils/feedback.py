@@ -0,0 +1,296 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import atexit
+import bisect
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from typing import Any
+
+from google.cloud import logging as google_cloud_logging
+
+from app.utils.typing import Feedback
+
+
+class FeedbackBufferFullError(RuntimeError):
+    """Raised when feedback cannot be buffered because the buffer stayed full."""
+
+
+class FeedbackBuffer:
+    """
+    A bounded in-process buffer that writes feedback to Cloud Logging in batches
+    from a background thread, so callers never wait on the Logging API.
+
+    A batch is written once ``batch_size`` entries are buffered or
+    ``flush_interval`` seconds after its first entry. When the buffer is full,
+    ``add`` blocks for up to ``put_timeout`` seconds and then raises
+    ``FeedbackBufferFullError``.
+    """
+
+    def __init__(
+        self,
+        logger: google_cloud_logging.Logger,
+        max_size: int = 10_000,
+        batch_size: int = 100,
+        flush_interval: float = 2.0,
+        put_timeout: float = 1.0,
+    ) -> None:
+        """
+        Initialize the buffer and start its writer thread.
+
+        :param logger: Cloud Logging logger the feedback is written to
+        :param max_size: Maximum number of buffered entries
+        :param batch_size: Maximum number of entries per write request
+        :param flush_interval: Seconds an entry may wait before its batch is written
+        :param put_timeout: Seconds ``add`` waits for room when the buffer is full
+        """
+        self.logger = logger
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue: queue.Queue[dict[str, Any] | None] = queue.Queue(maxsize=max_size)
+        self._idle = threading.Condition()
+        self._in_flight = 0
+        self._thread = threading.Thread(
+            target=self._run, name="feedback-writer", daemon=True
+        )
+        self._thread.start()
+        # entries still buffered when the worker exits would otherwise be lost
+        atexit.register(self.close, timeout=10)
+
+    def add(self, entry: dict[str, Any]) -> None:
+        """
+        Buffer one feedback entry.
+
+        :param entry: The log payload
+        :raises FeedbackBufferFullError: If the buffer stays full for ``put_timeout``
+        """
+        with self._idle:
+            self._in_flight += 1
+        try:
+            self._queue.put(entry, timeout=self.put_timeout)
+        except queue.Full as e:
+            self._done(1)
+            raise FeedbackBufferFullError(
+                "Feedback buffer is full, retry later"
+            ) from e
+
+    def _done(self, count: int) -> None:
+        with self._idle:
+            self._in_flight -= count
+            if self._in_flight == 0:
+                self._idle.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                return
+            batch = [entry]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stop = True
+                    break
+                batch.append(entry)
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, entries: list[dict[str, Any]]) -> None:
+        try:
+            batch = self.logger.batch()
+            for entry in entries:
+                batch.log_struct(entry, severity="INFO")
+            batch.commit()
+        except Exception as e:
+            logging.warning(f"Failed to write {len(entries)} feedback entries: {e}")
+        finally:
+            self._done(len(entries))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Wait until every entry buffered so far has been written.
+
+        :param timeout: Maximum seconds to wait
+        :return: Whether the buffer drained in time
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._in_flight == 0, timeout=timeout)
+
+    def close(self, timeout: float | None = None) -> None:
+        """Write what is buffered and stop the writer thread."""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+class ScoreStats:
+    """Count, sum and fixed-bin histogram of feedback scores."""
+
+    __slots__ = ("count", "histogram", "total")
+
+    def __init__(self, bins: int) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.histogram = [0] * bins
+
+    def add(self, score: float, bin_index: int, sign: int = 1) -> None:
+        self.count += sign
+        self.total += sign * score
+        self.histogram[bin_index] += sign
+
+    def to_dict(self, edges: Sequence[float]) -> dict[str, Any]:
+        labels = [f"<{edges[0]}"]
+        labels += [f"{low}-{high}" for low, high in itertools.pairwise(edges)]
+        labels.append(f">={edges[-1]}")
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "histogram": dict(zip(labels, self.histogram, strict=True)),
+        }
+
+
+class FeedbackAggregator:
+    """
+    Rolling in-memory aggregates of feedback scores, so quality can be read
+    without scanning the logs.
+
+    Keeps all-time stats, stats over the last ``window_minutes`` (per-minute
+    buckets whose expiry is subtracted from running totals) and all-time stats
+    per ``user_id`` and per ``invocation_id`` prefix. Per-key stats are kept for
+    the ``max_keys`` most recently seen keys. Every read costs the same no
+    matter how much feedback was recorded.
+
+    The aggregates only cover the feedback recorded by this process, since
+    ``started_at``; every worker process and replica keeps its own.
+    """
+
+    def __init__(
+        self,
+        bin_edges: Sequence[float] = (1, 2, 3, 4, 5),
+        window_minutes: int = 60,
+        invocation_prefix_length: int = 8,
+        max_keys: int = 10_000,
+    ) -> None:
+        """
+        Initialize the aggregator.
+
+        :param bin_edges: Ascending histogram bin edges; scores outside fall in the end bins
+        :param window_minutes: Length of the rolling window
+        :param invocation_prefix_length: Characters of ``invocation_id`` used as its group
+        :param max_keys: Maximum number of tracked users and of invocation prefixes
+        """
+        self.bin_edges = list(bin_edges)
+        self.window_minutes = window_minutes
+        self.invocation_prefix_length = invocation_prefix_length
+        self.max_keys = max_keys
+        self._bins = len(self.bin_edges) + 1
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._all = ScoreStats(self._bins)
+        self._window = ScoreStats(self._bins)
+        # ring of (minute, stats); a slot is reused once its minute left the window
+        self._minutes: list[tuple[int, ScoreStats] | None] = [None] * window_minutes
+        self._last_minute: int | None = None
+        self._by_user: OrderedDict[str, ScoreStats] = OrderedDict()
+        self._by_invocation: OrderedDict[str, ScoreStats] = OrderedDict()
+
+    def _keyed(self, stats: OrderedDict[str, ScoreStats], key: str) -> ScoreStats:
+        entry = stats.get(key)
+        if entry is None:
+            entry = stats[key] = ScoreStats(self._bins)
+            if len(stats) > self.max_keys:
+                stats.popitem(last=False)
+        else:
+            stats.move_to_end(key)
+        return entry
+
+    def _expire(self, minute: int) -> None:
+        if minute == self._last_minute:
+            return
+        self._last_minute = minute
+        for slot, entry in enumerate(self._minutes):
+            if entry is not None and entry[0] <= minute - self.window_minutes:
+                expired = entry[1]
+                self._window.count -= expired.count
+                self._window.total -= expired.total
+                for i, n in enumerate(expired.histogram):
+                    self._window.histogram[i] -= n
+                self._minutes[slot] = None
+
+    def add(self, feedback: Feedback, now: float | None = None) -> None:
+        """Record one feedback entry."""
+        minute = int((time.time() if now is None else now) // 60)
+        score = float(feedback.score)
+        bin_index = bisect.bisect_right(self.bin_edges, score)
+        with self._lock:
+            self._expire(minute)
+            slot = minute % self.window_minutes
+            entry = self._minutes[slot]
+            if entry is None:
+                entry = self._minutes[slot] = (minute, ScoreStats(self._bins))
+            entry[1].add(score, bin_index)
+            self._window.add(score, bin_index)
+            self._all.add(score, bin_index)
+            if feedback.user_id:
+                self._keyed(self._by_user, feedback.user_id).add(score, bin_index)
+            prefix = feedback.invocation_id[: self.invocation_prefix_length]
+            self._keyed(self._by_invocation, prefix).add(score, bin_index)
+
+    def summary(
+        self,
+        user_id: str | None = None,
+        invocation_prefix: str | None = None,
+        now: float | None = None,
+    ) -> dict[str, Any]:
+        """
+        Returns all-time and rolling window stats, plus those of one user and/or
+        one invocation_id prefix when given.
+        """
+        minute = int((time.time() if now is None else now) // 60)
+        with self._lock:
+            self._expire(minute)
+            summary: dict[str, Any] = {
+                "since": self.started_at,
+                "all_time": self._all.to_dict(self.bin_edges),
+                f"last_{self.window_minutes}_minutes": self._window.to_dict(
+                    self.bin_edges
+                ),
+            }
+            if user_id is not None:
+                stats = self._by_user.get(user_id) or ScoreStats(self._bins)
+                summary["user"] = {"user_id": user_id, **stats.to_dict(self.bin_edges)}
+            if invocation_prefix is not None:
+                prefix = invocation_prefix[: self.invocation_prefix_length]
+                stats = self._by_invocation.get(prefix) or ScoreStats(self._bins)
+                summary["invocation_prefix"] = {
+                    "prefix": prefix,
+                    **stats.to_dict(self.bin_edges),
+                }
+            return summary
@@ -13,9 +13,70 @@
 # limitations under the License.
 
 import logging
+import os
+import threading
 
 import google.cloud.storage as storage
 from google.api_core import exceptions
+from requests.adapters import HTTPAdapter
+
+GCS_POOL_SIZE = int(os.environ.get("GCS_POOL_SIZE", "32"))
+
+_lock = threading.Lock()
+_clients: dict[str | None, storage.Client] = {}
+_buckets: dict[tuple[str | None, str], storage.Bucket] = {}
+
+
+def _reset_after_fork() -> None:
+    # pooled connections must not be shared with the parent process
+    global _lock
+    _lock = threading.Lock()
+    _clients.clear()
+    _buckets.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_storage_client(project: str | None = None) -> storage.Client:
+    """Returns a process-wide storage client for the project.
+
+    The client is created once, so credentials are resolved once, and its HTTP
+    session keeps up to ``GCS_POOL_SIZE`` keep-alive connections for reuse.
+
+    Args:
+        project: Google Cloud project ID (defaults to the environment's project)
+    """
+    client = _clients.get(project)
+    if client is None:
+        with _lock:
+            client = _clients.get(project)
+            if client is None:
+                client = storage.Client(project=project)
+                adapter = HTTPAdapter(
+                    pool_connections=GCS_POOL_SIZE, pool_maxsize=GCS_POOL_SIZE
+                )
+                client._http.mount("https://", adapter)
+                client._http.mount("http://", adapter)
+                _clients[project] = client
+    return client
+
+
+def get_bucket(bucket_name: str, project: str | None = None) -> storage.Bucket:
+    """Returns a cached bucket handle of the pooled client (no API call is made).
+
+    Args:
+        bucket_name: Name of the bucket
+        project: Google Cloud project ID (defaults to the environment's project)
+    """
+    key = (project, bucket_name)
+    bucket = _buckets.get(key)
+    if bucket is None:
+        client = get_storage_client(project)
+        with _lock:
+            bucket = _buckets.setdefault(key, client.bucket(bucket_name))
+    return bucket
 
 
 def create_bucket_if_not_exists(bucket_name: str, project: str, location: str) -> None:
@@ -26,7 +87,7 @@ def create_bucket_if_not_exists(bucket_name: str, project: str, location: str) -
         project: Google Cloud project ID
         location: Location to create the bucket in (defaults to us-central1)
     """
-    storage_client = storage.Client(project=project)
+    storage_client = get_storage_client(project)
 
     if bucket_name.startswith("gs://"):
         bucket_name = bucket_name[5:]
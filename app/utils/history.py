@@ -0,0 +1,192 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+
+def content_bytes(content: types.Content) -> int:
+    """Size of a content's text, function calls and function responses in UTF-8 bytes."""
+    size = 0
+    for part in content.parts or []:
+        if part.text:
+            size += len(part.text.encode())
+        if part.function_call:
+            size += len(json.dumps(part.function_call.args or {}).encode()) + 32
+        if part.function_response:
+            size += len(
+                json.dumps(part.function_response.response or {}, default=str).encode()
+            ) + 32
+    return size
+
+
+def _starts_turn(content: types.Content) -> bool:
+    # a user message, as opposed to a function response also sent in the user role
+    return content.role == "user" and any(
+        part.text and not part.function_response for part in content.parts or []
+    )
+
+
+class HistoryCompactor:
+    """
+    Model callbacks keeping the prompt within ``token_budget`` tokens.
+
+    ``before_model`` drops the oldest turns of the conversation sent to the model
+    (the session itself is untouched) until the estimated prompt fits. The user
+    questions of the dropped turns are kept as a one-line note so the model knows
+    what was discussed. The current turn is always sent. Tokens are estimated from
+    the UTF-8 size, with the bytes per token ratio learned from the prompt token
+    counts the model reports. ``after_model`` logs prompt tokens and latency per
+    model call.
+    """
+
+    MAX_PENDING = 1024
+
+    def __init__(
+        self,
+        token_budget: int = 8000,
+        note_chars: int = 500,
+        bytes_per_token: float = 4.0,
+    ) -> None:
+        """
+        Initialize the compactor.
+
+        :param token_budget: Maximum estimated prompt tokens
+        :param note_chars: Maximum length of the note about dropped turns
+        :param bytes_per_token: Initial bytes per token ratio of the estimate
+        """
+        self.token_budget = token_budget
+        self.note_chars = note_chars
+        self.bytes_per_token = bytes_per_token
+        self._lock = threading.Lock()
+        # invocation_id -> (start time, estimated prompt bytes); calls that fail
+        # never reach after_model, so only the newest MAX_PENDING are kept
+        self._pending: OrderedDict[str, tuple[float, int]] = OrderedDict()
+        self.calls = 0
+        self.compacted_calls = 0
+        self.prompt_tokens = 0
+        self.latency_ms = 0.0
+
+    def __getstate__(self) -> dict[str, Any]:
+        # pickled with the agent for deployment, locks cannot be
+        state = dict(self.__dict__)
+        del state["_lock"]
+        state["_pending"] = OrderedDict()
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def before_model(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> LlmResponse | None:
+        contents = llm_request.contents
+        system_instruction = (
+            llm_request.config.system_instruction if llm_request.config else None
+        )
+        system_bytes = len(str(system_instruction or "").encode())
+        sizes = [content_bytes(content) for content in contents]
+        budget_bytes = self.token_budget * self.bytes_per_token - system_bytes
+
+        turn_starts = [i for i, content in enumerate(contents) if _starts_turn(content)]
+        total = sum(sizes)
+        # drop whole turns, oldest first, never the one being answered
+        cut = 0
+        for start in turn_starts[1:]:
+            if total - sum(sizes[:cut]) <= budget_bytes:
+                break
+            cut = start
+        if cut:
+            dropped = [
+                part.text.strip()
+                for content in contents[:cut]
+                if _starts_turn(content)
+                for part in content.parts or []
+                if part.text
+            ]
+            note = ("Earlier in this conversation the user asked: " + " | ".join(dropped))[
+                : self.note_chars
+            ]
+            first = contents[cut]
+            llm_request.contents = [
+                types.Content(
+                    role=first.role, parts=[types.Part(text=note), *(first.parts or [])]
+                ),
+                *contents[cut + 1 :],
+            ]
+            logging.info(
+                f"Compacted history from {len(contents)} to {len(llm_request.contents)} "
+                f"contents, ~{total / self.bytes_per_token:.0f} -> "
+                f"~{(sum(sizes[cut:]) + len(note)) / self.bytes_per_token:.0f} tokens"
+            )
+            with self._lock:
+                self.compacted_calls += 1
+        estimated = system_bytes + sum(
+            content_bytes(content) for content in llm_request.contents
+        )
+        with self._lock:
+            self._pending[callback_context.invocation_id] = (time.perf_counter(), estimated)
+            if len(self._pending) > self.MAX_PENDING:
+                self._pending.popitem(last=False)
+        return None
+
+    def after_model(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> LlmResponse | None:
+        if llm_response.partial:
+            return None
+        with self._lock:
+            pending = self._pending.pop(callback_context.invocation_id, None)
+        if pending is None:
+            return None
+        latency_ms = (time.perf_counter() - pending[0]) * 1000
+        usage = llm_response.usage_metadata
+        prompt_tokens = usage.prompt_token_count if usage else None
+        with self._lock:
+            self.calls += 1
+            self.latency_ms += latency_ms
+            if prompt_tokens:
+                self.prompt_tokens += prompt_tokens
+                # learn how many bytes a token covers for this model and language
+                # (the reported count also covers tool declarations, which makes
+                # the estimate err on the safe side)
+                ratio = 0.9 * self.bytes_per_token + 0.1 * pending[1] / prompt_tokens
+                self.bytes_per_token = min(max(ratio, 1.0), 8.0)
+        logging.info(
+            f"Model call: {prompt_tokens} prompt tokens, "
+            f"{usage.candidates_token_count if usage else None} output tokens, "
+            f"{latency_ms:.0f} ms"
+        )
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        """Returns model call counts and the mean prompt tokens and latency."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "compacted_calls": self.compacted_calls,
+                "mean_prompt_tokens": self.prompt_tokens / self.calls if self.calls else None,
+                "mean_latency_ms": self.latency_ms / self.calls if self.calls else None,
+                "bytes_per_token": self.bytes_per_token,
+            }
@@ -0,0 +1,51 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from functools import cached_property
+
+from google.adk.models import Gemini
+from google.genai import Client, types
+
+
+class VertexAiGemini(Gemini):
+    """
+    Gemini on Vertex AI in an explicit project and location.
+
+    ADK's ``Gemini`` creates its client from the GOOGLE_CLOUD_PROJECT,
+    GOOGLE_CLOUD_LOCATION and GOOGLE_GENAI_USE_VERTEXAI environment variables;
+    this model ignores them.
+    """
+
+    project: str
+    location: str = "us-central1"
+
+    def _client(self, http_options: types.HttpOptions) -> Client:
+        return Client(
+            vertexai=True,
+            project=self.project,
+            location=self.location,
+            http_options=http_options,
+        )
+
+    @cached_property
+    def api_client(self) -> Client:
+        return self._client(types.HttpOptions(headers=self._tracking_headers))
+
+    @cached_property
+    def _live_api_client(self) -> Client:
+        return self._client(
+            types.HttpOptions(
+                headers=self._tracking_headers, api_version=self._live_api_version
+            )
+        )
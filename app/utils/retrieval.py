@@ -0,0 +1,274 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+
+def normalize_query(query: str) -> str:
+    """Normalizes width, case, punctuation and whitespace so rephrasings share a key."""
+    text = unicodedata.normalize("NFKC", query).casefold()
+    text = "".join(
+        " " if unicodedata.category(char)[0] in "PS" else char for char in text
+    )
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class RetrievalCache:
+    """
+    Search results keyed on the search engine and the normalized query.
+
+    Entries expire after ``ttl_seconds``. The least recently used ones are evicted
+    once the cached results exceed ``max_bytes`` (as JSON). With ``path`` set,
+    entries are also written to a SQLite file and survive worker restarts.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 3600,
+        max_bytes: int = 32 * 1024 * 1024,
+        path: str | None = None,
+    ) -> None:
+        """
+        Initialize the cache.
+
+        :param ttl_seconds: Lifetime of a cached result
+        :param max_bytes: Memory budget of the cached results
+        :param path: Optional SQLite file persisting the cache
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, int, list[dict[str, Any]]]] = (
+            OrderedDict()
+        )
+        self._bytes = 0
+        self._db: sqlite3.Connection | None = None
+        self._db_pid: int | None = None
+
+    def __reduce__(self) -> tuple[Any, tuple[float, int, str | None]]:
+        # pickled with the agent for deployment: only the configuration is
+        # shipped, each worker starts with an empty cache and its own connection
+        return RetrievalCache, (self.ttl_seconds, self.max_bytes, self.path)
+
+    @staticmethod
+    def key(engine_id: str, query: str) -> str:
+        return hashlib.sha256(
+            f"{engine_id}\n{normalize_query(query)}".encode()
+        ).hexdigest()
+
+    def _connection(self, path: str) -> sqlite3.Connection:
+        # one connection per process, connections must not cross a fork
+        if self._db is None or self._db_pid != os.getpid():
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, expires_at REAL, value TEXT)"
+            )
+            self._db_pid = os.getpid()
+        return self._db
+
+    def _store(self, key: str, expires_at: float, value: str) -> None:
+        results = json.loads(value)
+        size = len(value.encode())
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (expires_at, size, results)
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._entries:
+            self._bytes -= self._entries.popitem(last=False)[1][1]
+
+    def get(self, engine_id: str, query: str) -> list[dict[str, Any]] | None:
+        """Returns the cached results, or None when missing or expired."""
+        key = self.key(engine_id, query)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                self._bytes -= self._entries.pop(key)[1]
+            if self.path:
+                row = (
+                    self._connection(self.path)
+                    .execute(
+                        "SELECT expires_at, value FROM results WHERE key = ?", (key,)
+                    )
+                    .fetchone()
+                )
+                if row is not None and row[0] > now:
+                    self._store(key, row[0], row[1])
+                    self.hits += 1
+                    return self._entries[key][2]
+            self.misses += 1
+            return None
+
+    def put(self, engine_id: str, query: str, results: list[dict[str, Any]]) -> None:
+        """Caches the results of a query."""
+        key = self.key(engine_id, query)
+        expires_at = time.time() + self.ttl_seconds
+        value = json.dumps(results, ensure_ascii=False)
+        with self._lock:
+            self._store(key, expires_at, value)
+            if self.path:
+                db = self._connection(self.path)
+                db.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                    (key, expires_at, value),
+                )
+                db.execute("DELETE FROM results WHERE expires_at <= ?", (time.time(),))
+                db.commit()
+
+    def stats(self) -> dict[str, int]:
+        """Returns the hit/miss counters, entry count and cached bytes."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+class VertexAiSearchRetriever:
+    """
+    Queries a Vertex AI Search (Discovery Engine) engine through its search API,
+    serving repeated queries from a ``RetrievalCache``.
+    """
+
+    def __init__(
+        self,
+        search_engine_id: str,
+        cache: RetrievalCache | None = None,
+        page_size: int = 5,
+        client: Any = None,
+    ) -> None:
+        """
+        Initialize the retriever.
+
+        :param search_engine_id: Full resource name of the search engine
+        :param cache: Cache of the search results, none when omitted
+        :param page_size: Number of results returned per query
+        :param client: Discovery Engine ``SearchServiceClient``, created on first use when omitted
+        """
+        self.search_engine_id = search_engine_id
+        self.serving_config = f"{search_engine_id}/servingConfigs/default_search"
+        self.cache = cache
+        self.page_size = page_size
+        self._client = client
+
+    def __getstate__(self) -> dict[str, Any]:
+        # the client holds channels that cannot be pickled, workers create their own
+        return dict(self.__dict__, _client=None)
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            from google.api_core.client_options import ClientOptions
+            from google.cloud import discoveryengine_v1 as discoveryengine
+
+            location = self.search_engine_id.split("/locations/")[1].split("/")[0]
+            endpoint = (
+                f"{location}-discoveryengine.googleapis.com"
+                if location != "global"
+                else None
+            )
+            self._client = discoveryengine.SearchServiceClient(
+                client_options=ClientOptions(api_endpoint=endpoint)
+            )
+        return self._client
+
+    def _search_remote(self, query: str) -> list[dict[str, Any]]:
+        from google.cloud import discoveryengine_v1 as discoveryengine
+
+        request = discoveryengine.SearchRequest(
+            serving_config=self.serving_config,
+            query=query,
+            page_size=self.page_size,
+            content_search_spec={
+                "snippet_spec": {"return_snippet": True},
+                "extractive_content_spec": {"max_extractive_answer_count": 1},
+            },
+        )
+        results = []
+        for result in itertools.islice(self.client.search(request), self.page_size):
+            data = discoveryengine.Document.to_dict(result.document).get(
+                "derived_struct_data", {}
+            )
+            results.append(
+                {
+                    "title": data.get("title", ""),
+                    "link": data.get("link", ""),
+                    "snippets": [s.get("snippet", "") for s in data.get("snippets", [])],
+                    "extractive_answers": [
+                        a.get("content", "") for a in data.get("extractive_answers", [])
+                    ],
+                }
+            )
+        return results
+
+    def search(self, query: str) -> list[dict[str, Any]]:
+        """Returns the results of a query, from the cache when possible."""
+        if self.cache is not None:
+            cached = self.cache.get(self.search_engine_id, query)
+            if cached is not None:
+                return cached
+        start = time.perf_counter()
+        results = self._search_remote(query)
+        logging.info(
+            f"Vertex AI Search returned {len(results)} results in "
+            f"{(time.perf_counter() - start) * 1000:.0f} ms"
+        )
+        if self.cache is not None:
+            self.cache.put(self.search_engine_id, query, results)
+        return results
+
+    def as_tool(self) -> Callable[[str], Awaitable[dict[str, Any]]]:
+        """
+        Returns the retriever as a function the agent can call.
+
+        It is a coroutine function: ADK runs synchronous tools on the event loop,
+        where the blocking search call would stall every other query of the worker.
+        """
+
+        async def search_documents(query: str) -> dict[str, Any]:
+            """Searches the company documents and policies.
+
+            Args:
+                query: The question or keywords to search for.
+
+            Returns:
+                The matching documents with their title, link and relevant snippets.
+            """
+            return {"results": await asyncio.to_thread(self.search, query)}
+
+        return search_documents
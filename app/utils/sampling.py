@@ -0,0 +1,123 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import threading
+from collections import OrderedDict
+
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.trace import StatusCode
+
+
+class TailSamplingSpanProcessor(SpanProcessor):
+    """
+    A span processor that decides per trace, once the trace's root span has ended,
+    whether its spans are passed on to the wrapped processor.
+
+    A trace is kept when any of its spans has an error status, when its root span
+    took at least ``latency_threshold_ms``, or otherwise for ``sample_rate`` of
+    traces (chosen from the trace ID, so the decision is the same everywhere).
+    Dropped traces never reach the exporter, so they cost no serialization.
+    """
+
+    def __init__(
+        self,
+        delegate: SpanProcessor,
+        sample_rate: float = 0.1,
+        latency_threshold_ms: float = 10_000,
+        max_pending_traces: int = 10_000,
+    ) -> None:
+        """
+        Initialize the processor.
+
+        :param delegate: Processor receiving the spans of kept traces
+        :param sample_rate: Fraction (0..1) of normal traces to keep
+        :param latency_threshold_ms: Root span duration from which a trace is always kept
+        :param max_pending_traces: Traces buffered while waiting for their root span
+        """
+        self.delegate = delegate
+        self.sample_rate = sample_rate
+        self.latency_threshold_ns = latency_threshold_ms * 1_000_000
+        self.max_pending_traces = max_pending_traces
+        self.kept_traces = 0
+        self.dropped_traces = 0
+        self._lock = threading.Lock()
+        self._pending: OrderedDict[int, list[ReadableSpan]] = OrderedDict()
+        # spans ending after their root follow the decision already made
+        self._decided: OrderedDict[int, bool] = OrderedDict()
+
+    def on_start(self, span: Span, parent_context: Context | None = None) -> None:
+        self.delegate.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        trace_id = span.context.trace_id
+        is_root = span.parent is None or span.parent.is_remote
+        with self._lock:
+            decision = self._decided.get(trace_id)
+            if decision is None:
+                spans = self._pending.setdefault(trace_id, [])
+                spans.append(span)
+                if not is_root:
+                    self._evict_pending()
+                    return
+                del self._pending[trace_id]
+                decision = self._should_keep(span, spans)
+                self._decided[trace_id] = decision
+                if len(self._decided) > self.max_pending_traces:
+                    self._decided.popitem(last=False)
+                if decision:
+                    self.kept_traces += 1
+                else:
+                    self.dropped_traces += 1
+            else:
+                spans = [span]
+        if decision:
+            for kept in spans:
+                self.delegate.on_end(kept)
+
+    def _should_keep(self, root: ReadableSpan, spans: list[ReadableSpan]) -> bool:
+        if any(span.status.status_code == StatusCode.ERROR for span in spans):
+            return True
+        if (
+            root.end_time is not None
+            and root.start_time is not None
+            and root.end_time - root.start_time >= self.latency_threshold_ns
+        ):
+            return True
+        # the low 64 bits of a trace ID are random
+        return (root.context.trace_id & 0xFFFFFFFFFFFFFFFF) < self.sample_rate * 2**64
+
+    def _evict_pending(self) -> None:
+        # traces whose root never ends locally must not grow the buffer forever
+        while len(self._pending) > self.max_pending_traces:
+            self._pending.popitem(last=False)
+            self.dropped_traces += 1
+            logging.warning("Tail sampling buffer full, dropping oldest pending trace")
+
+    def stats(self) -> dict[str, int]:
+        """Returns the kept/dropped trace counters and the number of pending traces."""
+        with self._lock:
+            return {
+                "kept_traces": self.kept_traces,
+                "dropped_traces": self.dropped_traces,
+                "pending_traces": len(self._pending),
+            }
+
+    def shutdown(self) -> None:
+        logging.info(f"Tail sampling stats at shutdown: {self.stats()}")
+        self.delegate.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.delegate.force_flush(timeout_millis)
@@ -12,19 +12,217 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import gzip
 import json
 import logging
-from collections.abc import Sequence
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
 import google.cloud.storage as storage
 from google.cloud import logging as google_cloud_logging
 from opentelemetry.exporter.cloud_trace import CloudTraceSpanExporter
+from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace import ReadableSpan
-from opentelemetry.sdk.trace.export import SpanExportResult
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+from opentelemetry.sdk.util import ns_to_iso_str
+from opentelemetry.trace import SpanContext, format_span_id, format_trace_id
 
+from app.utils.gcs import get_storage_client
 
-class CloudTraceLoggingSpanExporter(CloudTraceSpanExporter):
+# Cloud Logging rejects entries above 256 KB, leave room for the rest of the span
+MAX_ATTRIBUTES_SIZE = 255 * 1024
+
+
+def json_size(value: Any) -> int:
+    """
+    Estimate the UTF-8 size of ``value`` serialized as JSON without serializing it.
+
+    Exact for plain ASCII strings, numbers, booleans and containers of those;
+    characters that JSON needs to escape are counted once.
+    """
+    if isinstance(value, str):
+        return (len(value) if value.isascii() else len(value.encode())) + 2
+    if isinstance(value, bool) or value is None:
+        return 5 if value is False else 4
+    if isinstance(value, int | float):
+        return len(repr(value))
+    if isinstance(value, Mapping):
+        # '{}' plus '"key": value' joined by ', '
+        size = 2 + max(len(value) - 1, 0) * 2
+        for key, item in value.items():
+            size += json_size(str(key)) + 2 + json_size(item)
+        return size
+    if isinstance(value, Sequence):
+        size = 2 + max(len(value) - 1, 0) * 2
+        for item in value:
+            size += json_size(item)
+        return size
+    return json_size(str(value))
+
+
+def _format_context(context: SpanContext) -> dict:
+    return {
+        "trace_id": f"0x{format_trace_id(context.trace_id)}",
+        "span_id": f"0x{format_span_id(context.span_id)}",
+        "trace_state": repr(context.trace_state),
+    }
+
+
+def _format_attributes(attributes: Mapping[str, Any] | None) -> dict:
+    # sequence attribute values are tuples in the SDK, JSON only knows lists
+    return {
+        key: list(value) if isinstance(value, tuple) else value
+        for key, value in (attributes or {}).items()
+    }
+
+
+_resource_dicts: dict[int, tuple[Resource, dict]] = {}
+
+
+def _format_resource(resource: Resource) -> dict:
+    # every span of a provider shares one immutable Resource, convert it once;
+    # the returned dict is shared between spans and must not be modified
+    cached = _resource_dicts.get(id(resource))
+    if cached is None or cached[0] is not resource:
+        cached = (
+            resource,
+            {
+                "attributes": _format_attributes(resource.attributes),
+                "schema_url": resource.schema_url,
+            },
+        )
+        _resource_dicts[id(resource)] = cached
+    return cached[1]
+
+
+def span_to_dict(span: ReadableSpan) -> dict:
+    """
+    Convert a span to the dict ``json.loads(span.to_json())`` would return,
+    without going through a JSON string.
+    """
+    status = {"status_code": span.status.status_code.name}
+    if span.status.description:
+        status["description"] = span.status.description
+    return {
+        "name": span.name,
+        "context": _format_context(span.context) if span.context else None,
+        "kind": str(span.kind),
+        "parent_id": f"0x{format_span_id(span.parent.span_id)}"
+        if span.parent is not None
+        else None,
+        "start_time": ns_to_iso_str(span.start_time) if span.start_time else None,
+        "end_time": ns_to_iso_str(span.end_time) if span.end_time else None,
+        "status": status,
+        "attributes": _format_attributes(span.attributes),
+        "events": [
+            {
+                "name": event.name,
+                "timestamp": ns_to_iso_str(event.timestamp),
+                "attributes": _format_attributes(event.attributes),
+            }
+            for event in span.events
+        ],
+        "links": [
+            {
+                "context": _format_context(link.context),
+                "attributes": _format_attributes(link.attributes),
+            }
+            for link in span.links
+        ],
+        "resource": _format_resource(span.resource),
+    }
+
+
+class SpanDictMixin(ABC):
+    """
+    Builds the span dict written by the exporters in this module and moves
+    oversized attribute values out of it. Subclasses set ``project_id`` and
+    implement ``_offload_attribute``.
+    """
+
+    # characters of an offloaded attribute kept in the span dict
+    PREVIEW_CHARS = 1024
+    project_id: str | None
+
+    def _span_dict(self, span: ReadableSpan) -> tuple[str, dict]:
+        """
+        Convert a span to the exported dict, with the trace resource name and span ID.
+
+        :param span: The span to convert
+        :return: The span ID (hex) and the span dictionary
+        """
+        span_context = span.get_span_context()
+        trace_id = format(span_context.trace_id, "x")
+        span_id = format(span_context.span_id, "x")
+        span_dict = span_to_dict(span)
+
+        span_dict["trace"] = f"projects/{self.project_id}/traces/{trace_id}"
+        span_dict["span_id"] = span_id
+        return span_id, span_dict
+
+    @abstractmethod
+    def _offload_attribute(self, key: str, value: Any, span_id: str) -> dict:
+        """
+        Store one attribute value outside the span dict.
+
+        :param key: The attribute key
+        :param value: The attribute value
+        :param span_id: The span ID (hex)
+        :return: The replacement kept in the span dict
+        """
+
+    def _process_large_attributes(
+        self, span_dict: dict, span_id: str, attributes_size: int | None = None
+    ) -> dict:
+        """
+        Process large attribute values by storing them outside the span dict if they
+        exceed the size limit of Google Cloud Logging.
+
+        Only the largest values are moved out, one object per attribute, until the
+        rest fits; each is replaced by what ``_offload_attribute`` returns, a short
+        preview and the URI the value is stored at.
+
+        :param span_dict: The span data dictionary
+        :param trace_id: The trace ID
+        :param span_id: The span ID
+        :param attributes_size: Estimated JSON size of the attributes, if already known
+        :return: The updated span dictionary
+        """
+        attributes = span_dict["attributes"]
+        if attributes_size is None:
+            attributes_size = json_size(attributes)
+        if attributes_size > MAX_ATTRIBUTES_SIZE:  # 250 KB
+            attributes_retain = dict(attributes.items())
+            sizes = sorted(
+                ((json_size(value), key) for key, value in attributes.items()),
+                reverse=True,
+            )
+            offloaded = []
+            for value_size, key in sizes:
+                if attributes_size <= MAX_ATTRIBUTES_SIZE:
+                    break
+                replacement = self._offload_attribute(key, attributes[key], span_id)
+                del attributes_retain[key]
+                attributes_retain.update(replacement)
+                attributes_size += json_size(replacement) - value_size - json_size(key)
+                offloaded.append(key)
+
+            span_dict["attributes"] = attributes_retain
+            logging.info(
+                "Length of payload span above 250 KB, storing attributes "
+                f"{', '.join(offloaded)} separately to avoid large log entry errors"
+            )
+
+        return span_dict
+
+
+
+class CloudTraceLoggingSpanExporter(SpanDictMixin, CloudTraceSpanExporter):
     """
     An extended version of CloudTraceSpanExporter that logs span data to Google Cloud Logging
     and handles large attribute values by storing them in Google Cloud Storage.
@@ -33,12 +231,18 @@ class CloudTraceLoggingSpanExporter(CloudTraceSpanExporter):
     by leveraging Cloud Logging (which has a 256KB limit) and Cloud Storage for larger payloads.
     """
 
+    # seconds a bucket existence check is trusted for
+    BUCKET_CHECK_INTERVAL = 600
+
     def __init__(
         self,
         logging_client: google_cloud_logging.Client | None = None,
         storage_client: storage.Client | None = None,
         bucket_name: str | None = None,
         debug: bool = False,
+        max_batch_entries: int = 500,
+        max_batch_bytes: int = 5 * 1024 * 1024,
+        offload_workers: int = 4,
         **kwargs: Any,
     ) -> None:
         """
@@ -48,45 +252,71 @@ class CloudTraceLoggingSpanExporter(CloudTraceSpanExporter):
         :param storage_client: Google Cloud Storage client
         :param bucket_name: Name of the GCS bucket to store large payloads
         :param debug: Enable debug mode for additional logging
+        :param max_batch_entries: Maximum number of log entries per write request
+        :param max_batch_bytes: Maximum estimated size of one write request
+        :param offload_workers: Threads uploading large attributes to GCS
         :param kwargs: Additional arguments to pass to the parent class
         """
         super().__init__(**kwargs)
         self.debug = debug
+        self.max_batch_entries = max_batch_entries
+        self.max_batch_bytes = max_batch_bytes
         self.logging_client = logging_client or google_cloud_logging.Client(
             project=self.project_id
         )
         self.logger = self.logging_client.logger(__name__)
-        self.storage_client = storage_client or storage.Client(project=self.project_id)
+        self.storage_client = storage_client or get_storage_client(self.project_id)
         self.bucket_name = (
             bucket_name or f"{self.project_id}-linebot-agent-logs-data"
         )
         self.bucket = self.storage_client.bucket(self.bucket_name)
+        self._bucket_lock = threading.Lock()
+        self._bucket_checked_at: float | None = None
+        self._bucket_found = False
+        self._offload_pool = ThreadPoolExecutor(
+            max_workers=offload_workers, thread_name_prefix="span-offload"
+        )
 
     def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
         """
         Export the spans to Google Cloud Logging and Cloud Trace.
 
+        The log entries of a batch are sent in as few write requests as the
+        ``max_batch_entries`` and ``max_batch_bytes`` limits allow.
+
         :param spans: A sequence of spans to export
         :return: The result of the export operation
         """
+        logged = True
+        batch = self.logger.batch()
+        batch_entries = batch_bytes = 0
         for span in spans:
-            span_context = span.get_span_context()
-            trace_id = format(span_context.trace_id, "x")
-            span_id = format(span_context.span_id, "x")
-            span_dict = json.loads(span.to_json())
-
-            span_dict["trace"] = f"projects/{self.project_id}/traces/{trace_id}"
-            span_dict["span_id"] = span_id
+            span_id, span_dict = self._span_dict(span)
 
+            attributes = span_dict["attributes"]
+            attributes_size = json_size(attributes)
             span_dict = self._process_large_attributes(
-                span_dict=span_dict, span_id=span_id
+                span_dict=span_dict, span_id=span_id, attributes_size=attributes_size
+            )
+            if span_dict["attributes"] is not attributes:
+                attributes_size = json_size(span_dict["attributes"])
+            entry_size = attributes_size + json_size(
+                {key: value for key, value in span_dict.items() if key != "attributes"}
             )
 
             if self.debug:
                 print(span_dict)
 
-            # Log the span data to Google Cloud Logging
-            self.logger.log_struct(
+            if batch_entries and (
+                batch_entries >= self.max_batch_entries
+                or batch_bytes + entry_size > self.max_batch_bytes
+            ):
+                logged = self._commit(batch) and logged
+                batch = self.logger.batch()
+                batch_entries = batch_bytes = 0
+
+            # Queue the span data for Google Cloud Logging
+            batch.log_struct(
                 span_dict,
                 labels={
                     "type": "agent_telemetry",
@@ -94,58 +324,231 @@ class CloudTraceLoggingSpanExporter(CloudTraceSpanExporter):
                 },
                 severity="INFO",
             )
+            batch_entries += 1
+            batch_bytes += entry_size
+        if batch_entries:
+            logged = self._commit(batch) and logged
+
         # Export spans to Google Cloud Trace using the parent class method
-        return super().export(spans)
+        result = super().export(spans)
+        return result if logged else SpanExportResult.FAILURE
+
+    def _commit(self, batch: google_cloud_logging.Batch) -> bool:
+        """
+        Send one batch of log entries to Google Cloud Logging.
+
+        :param batch: The batch to commit
+        :return: Whether the write succeeded
+        """
+        try:
+            batch.commit()
+        except Exception as e:
+            logging.warning(f"Failed to write span batch to Cloud Logging: {e}")
+            return False
+        return True
 
-    def store_in_gcs(self, content: str, span_id: str) -> str:
+    def store_in_gcs(
+        self,
+        content: str | bytes,
+        span_id: str,
+        blob_name: str | None = None,
+        content_encoding: str | None = None,
+    ) -> str:
         """
         Initiate storing large content in Google Cloud Storage/
 
+        The bucket's existence is checked once and remembered for
+        ``BUCKET_CHECK_INTERVAL`` seconds rather than on every upload.
+
         :param content: The content to store
         :param span_id: The ID of the span
+        :param blob_name: Object name, defaults to ``spans/<span_id>.json``
+        :param content_encoding: Content-Encoding of ``content`` (e.g. ``gzip``)
         :return: The  GCS URI of the stored content
         """
-        if not self.storage_client.bucket(self.bucket_name).exists():
+        if not self._bucket_exists():
             logging.warning(
                 f"Bucket {self.bucket_name} not found. "
                 "Unable to store span attributes in GCS."
             )
             return "GCS bucket not found"
 
-        blob_name = f"spans/{span_id}.json"
+        blob_name = blob_name or f"spans/{span_id}.json"
         blob = self.bucket.blob(blob_name)
+        if content_encoding:
+            blob.content_encoding = content_encoding
 
         blob.upload_from_string(content, "application/json")
         return f"gs://{self.bucket_name}/{blob_name}"
 
-    def _process_large_attributes(self, span_dict: dict, span_id: str) -> dict:
+    def _bucket_exists(self) -> bool:
+        with self._bucket_lock:
+            now = time.monotonic()
+            if self._bucket_checked_at is None or (
+                now - self._bucket_checked_at > self.BUCKET_CHECK_INTERVAL
+            ):
+                self._bucket_found = self.bucket.exists()
+                self._bucket_checked_at = now
+            return self._bucket_found
+
+    def _offload_attribute(self, key: str, value: Any, span_id: str) -> dict:
         """
-        Process large attribute values by storing them in GCS if they exceed the size
-        limit of Google Cloud Logging.
+        Schedule a gzip-compressed upload of one attribute value on the background
+        pool and return the attributes that replace it in the log entry.
 
-        :param span_dict: The span data dictionary
-        :param trace_id: The trace ID
+        :param key: The attribute name
+        :param value: The attribute value
         :param span_id: The span ID
-        :return: The updated span dictionary
+        :return: A preview of the value plus the GCS URI and URL it is stored at
         """
-        attributes = span_dict["attributes"]
-        if len(json.dumps(attributes).encode()) > 255 * 1024:  # 250 KB
-            # Separate large payload from other attributes
-            attributes_payload = dict(attributes.items())
-            attributes_retain = dict(attributes.items())
+        blob_name = f"spans/{span_id}/{key}.json.gz"
 
-            # Store large payload in GCS
-            gcs_uri = self.store_in_gcs(json.dumps(attributes_payload), span_id)
-            attributes_retain["uri_payload"] = gcs_uri
-            attributes_retain["url_payload"] = (
-                f"https://storage.mtls.cloud.google.com/"
-                f"{self.bucket_name}/spans/{span_id}.json"
-            )
+        def upload() -> None:
+            content = gzip.compress(json.dumps(value).encode())
+            try:
+                self.store_in_gcs(content, span_id, blob_name, content_encoding="gzip")
+            except Exception as e:
+                logging.warning(f"Failed to store span attribute {key} in GCS: {e}")
 
-            span_dict["attributes"] = attributes_retain
-            logging.info(
-                "Length of payload span above 250 KB, storing attributes in GCS "
-                "to avoid large log entry errors"
-            )
+        self._offload_pool.submit(upload)
+        text = value if isinstance(value, str) else json.dumps(value)
+        return {
+            key: text[: self.PREVIEW_CHARS],
+            f"{key}.uri_payload": f"gs://{self.bucket_name}/{blob_name}",
+            f"{key}.url_payload": (
+                f"https://storage.mtls.cloud.google.com/{self.bucket_name}/{blob_name}"
+            ),
+        }
 
-        return span_dict
+    def shutdown(self) -> None:
+        """Wait for pending attribute uploads, then shut down the trace exporter."""
+        self._offload_pool.shutdown(wait=True)
+        super().shutdown()
+
+
+class LocalFileSpanExporter(SpanDictMixin, SpanExporter):
+    """
+    Writes the same span dicts as CloudTraceLoggingSpanExporter to compressed JSONL
+    files on local disk, one span per line, so agent runs can be traced and
+    profiled without cloud access.
+
+    Files are named ``spans-<pid>-<timestamp>-<n>.jsonl.gz`` (or ``.zst``), rotated
+    once ``max_file_bytes`` of uncompressed JSON was written, and only the newest
+    ``max_files`` of this process are kept. Oversized attributes go to
+    ``<directory>/spans/<span_id>/<key>.json.gz`` with a ``file://`` URI.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        project_id: str | None = None,
+        compression: str = "gzip",
+        max_file_bytes: int = 64 * 1024 * 1024,
+        max_files: int = 20,
+        debug: bool = False,
+    ) -> None:
+        """
+        Initialize the exporter.
+
+        :param directory: Directory the span files are written to
+        :param project_id: Project used in the ``trace`` resource name
+        :param compression: ``gzip`` or ``zstd`` (needs the zstandard package)
+        :param max_file_bytes: Uncompressed bytes written before a file is rotated
+        :param max_files: Span files of this process kept on disk
+        :param debug: Enable debug mode for additional logging
+        """
+        if compression not in ("gzip", "zstd"):
+            raise ValueError(f"Unsupported compression {compression!r}")
+        if compression == "zstd":
+            import zstandard
+
+            self._zstd = zstandard.ZstdCompressor()
+        self.directory = directory
+        self.project_id = project_id or "local"
+        self.compression = compression
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.debug = debug
+        self._lock = threading.Lock()
+        self._file: Any = None
+        self._file_bytes = 0
+        self._files: list[str] = []
+        self._file_seq = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _open(self) -> None:
+        suffix = "gz" if self.compression == "gzip" else "zst"
+        path = os.path.join(
+            self.directory,
+            f"spans-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}-{self._file_seq}.jsonl.{suffix}",
+        )
+        self._file_seq += 1
+        if self.compression == "gzip":
+            self._file = gzip.open(path, "ab")
+        else:
+            self._file = self._zstd.stream_writer(open(path, "ab"))
+        self._file_bytes = 0
+        self._files.append(path)
+        while len(self._files) > self.max_files:
+            try:
+                os.remove(self._files.pop(0))
+            except FileNotFoundError:
+                pass
+
+    def _close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        """
+        Append the spans to the current span file.
+
+        :param spans: A sequence of spans to export
+        :return: The result of the export operation
+        """
+        lines = []
+        for span in spans:
+            span_id, span_dict = self._span_dict(span)
+            span_dict = self._process_large_attributes(span_dict=span_dict, span_id=span_id)
+            if self.debug:
+                print(span_dict)
+            lines.append(json.dumps(span_dict).encode() + b"\n")
+
+        data = b"".join(lines)
+        try:
+            with self._lock:
+                if self._file is None or self._file_bytes >= self.max_file_bytes:
+                    self._close()
+                    self._open()
+                self._file.write(data)
+                # make every export readable even if the process dies afterwards
+                self._file.flush()
+                self._file_bytes += len(data)
+        except OSError as e:
+            logging.warning(f"Failed to write spans to {self.directory}: {e}")
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def _offload_attribute(self, key: str, value: Any, span_id: str) -> dict:
+        """
+        Store one attribute value gzip-compressed next to the span files.
+
+        :param key: The attribute name
+        :param value: The attribute value
+        :param span_id: The span ID
+        :return: A preview of the value plus the file URI it is stored at
+        """
+        path = os.path.join(self.directory, "spans", span_id, f"{key}.json.gz")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(gzip.compress(json.dumps(value).encode()))
+        text = value if isinstance(value, str) else json.dumps(value)
+        return {
+            key: text[: self.PREVIEW_CHARS],
+            f"{key}.uri_payload": f"file://{os.path.abspath(path)}",
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._close()
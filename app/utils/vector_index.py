@@ -0,0 +1,241 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Local vector index over the document corpus, searched in process before
+falling back to Vertex AI Search.
+
+The index is built offline:
+
+    uv run python -m app.utils.vector_index \\
+        --faq deployment/terraform/other/faq.jsonl --output .vector_index
+"""
+
+import argparse
+import json
+import logging
+import mmap
+import os
+import time
+import zlib
+from collections.abc import Callable, Iterable
+from typing import Any
+
+import numpy as np
+
+from app.utils.retrieval import normalize_query
+
+EMBEDDINGS_FILE = "embeddings.npy"
+IDF_FILE = "idf.npy"
+CHUNKS_FILE = "chunks.jsonl"
+OFFSETS_FILE = "offsets.npy"
+CONFIG_FILE = "index.json"
+
+
+def tokenize(text: str) -> list[str]:
+    """Words of the normalized text, plus character bigrams of non-ASCII words
+    since scripts such as Thai do not separate words with spaces."""
+    tokens = []
+    for word in normalize_query(text).split():
+        tokens.append(word)
+        if not word.isascii() and len(word) > 2:
+            tokens.extend(word[i : i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+class HashingEmbedder:
+    """
+    Signed feature hashing of tokens into ``dim`` dimensions.
+
+    Needs no model or network call, so queries are embedded in microseconds.
+    Buckets are weighted by the corpus IDF stored with the index.
+    """
+
+    def __init__(self, dim: int = 512) -> None:
+        self.dim = dim
+
+    def counts(self, texts: Iterable[str]) -> np.ndarray:
+        """Returns the signed token counts of each text, one row per text."""
+        texts = list(texts)
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                # crc32 rather than hash(), which differs between processes
+                h = zlib.crc32(token.encode())
+                matrix[row, h % self.dim] += 1.0 if (h // self.dim) & 1 else -1.0
+        return matrix
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def build_index(
+    chunks: list[dict[str, Any]], output_dir: str, embedder: HashingEmbedder
+) -> None:
+    """
+    Writes the embedding matrix, IDF weights and chunk metadata of ``chunks``.
+
+    :param chunks: Dicts with the ``text`` to embed plus any metadata to return
+    :param output_dir: Directory receiving the index files
+    :param embedder: Embedder used for the chunks and, later, the queries
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    counts = embedder.counts(chunk["text"] for chunk in chunks)
+    df = np.count_nonzero(counts, axis=0)
+    idf = np.log1p((len(chunks) + 1) / (df + 1)).astype(np.float32)
+    embeddings = _normalize_rows(counts * idf).astype(np.float32)
+
+    np.save(os.path.join(output_dir, EMBEDDINGS_FILE), embeddings)
+    np.save(os.path.join(output_dir, IDF_FILE), idf)
+    # byte offset of every line, so a chunk is read without parsing the others
+    offsets = [0]
+    with open(os.path.join(output_dir, CHUNKS_FILE), "wb") as f:
+        for chunk in chunks:
+            offsets.append(offsets[-1] + f.write(
+                (json.dumps(chunk, ensure_ascii=False) + "\n").encode()
+            ))
+    np.save(os.path.join(output_dir, OFFSETS_FILE), np.array(offsets, dtype=np.int64))
+    with open(os.path.join(output_dir, CONFIG_FILE), "w") as f:
+        json.dump({"embedder": "hashing", "dim": embedder.dim, "chunks": len(chunks)}, f)
+    logging.info(f"Wrote a vector index of {len(chunks)} chunks to {output_dir}")
+
+
+class VectorIndex:
+    """
+    Top-k cosine search over an index written by ``build_index``.
+
+    The embedding matrix and the chunk file are memory-mapped, so loading copies
+    nothing, the OS page cache is shared by every worker process on the host, and
+    only the chunks of a result are parsed.
+    """
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        chunks: bytes | mmap.mmap,
+        offsets: np.ndarray,
+        embedder: HashingEmbedder,
+        idf: np.ndarray,
+        directory: str | None = None,
+    ) -> None:
+        self.embeddings = embeddings
+        self.chunks = chunks
+        self.offsets = offsets
+        self.embedder = embedder
+        self.idf = idf
+        self.directory = directory
+
+    def __reduce__(self) -> tuple[Any, tuple[str]]:
+        # pickled with the agent for deployment: the worker maps the index files
+        # again, from the same relative directory shipped with extra_packages
+        if self.directory is None:
+            raise TypeError("Only a VectorIndex opened with VectorIndex.load can be pickled")
+        return VectorIndex.load, (self.directory,)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def chunk(self, i: int) -> dict[str, Any]:
+        """Returns the metadata of chunk ``i``."""
+        return json.loads(self.chunks[self.offsets[i] : self.offsets[i + 1]])
+
+    @classmethod
+    def load(cls, directory: str) -> "VectorIndex":
+        """Opens the index in ``directory`` without reading the embeddings into memory."""
+        with open(os.path.join(directory, CONFIG_FILE)) as f:
+            config = json.load(f)
+        embeddings = np.load(os.path.join(directory, EMBEDDINGS_FILE), mmap_mode="r")
+        offsets = np.load(os.path.join(directory, OFFSETS_FILE), mmap_mode="r")
+        chunks: bytes | mmap.mmap = b""
+        if len(offsets) > 1:
+            with open(os.path.join(directory, CHUNKS_FILE), "rb") as f:
+                chunks = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(
+            embeddings,
+            chunks,
+            offsets,
+            HashingEmbedder(config["dim"]),
+            np.load(os.path.join(directory, IDF_FILE)),
+            directory,
+        )
+
+    def embed_query(self, query: str) -> np.ndarray:
+        return _normalize_rows(self.embedder.counts([query]) * self.idf)[0]
+
+    def search(self, query: str, k: int = 3) -> list[tuple[float, dict[str, Any]]]:
+        """Returns the ``k`` chunks most similar to the query with their cosine score."""
+        if not len(self):
+            return []
+        scores = self.embeddings @ self.embed_query(query)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self.chunk(int(i))) for i in top]
+
+    def as_tool(
+        self, min_score: float = 0.5, k: int = 3
+    ) -> Callable[[str], dict[str, Any]]:
+        """Returns the index as a function the agent calls before the remote search."""
+
+        def search_local_documents(query: str) -> dict[str, Any]:
+            """Searches the local copy of the FAQ and documents. Fast, call it first.
+
+            Args:
+                query: The question or keywords to search for.
+
+            Returns:
+                The best matching entries with their similarity score, and
+                `fallback` set when none matched well enough, in which case the
+                remote document search should be used.
+            """
+            start = time.perf_counter()
+            matches = self.search(query, k=k)
+            logging.info(
+                f"Local vector search took {(time.perf_counter() - start) * 1e6:.0f} us"
+            )
+            return {
+                "results": [
+                    {"score": round(score, 3), **chunk} for score, chunk in matches
+                ],
+                "fallback": not matches or matches[0][0] < min_score,
+            }
+
+        return search_local_documents
+
+
+def faq_chunks(path: str) -> list[dict[str, Any]]:
+    """Reads a faq.jsonl file into chunks embedding the question and the answer."""
+    chunks = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                chunks.append(
+                    {
+                        "text": f"{item['faq_question']}\n{item['faq_answer']}",
+                        "source": "faq",
+                    }
+                )
+    return chunks
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the local vector index")
+    parser.add_argument("--faq", required=True, help="Path to faq.jsonl")
+    parser.add_argument("--output", default=".vector_index", help="Index directory")
+    parser.add_argument("--dim", type=int, default=512, help="Embedding dimensions")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    build_index(faq_chunks(args.faq), args.output, HashingEmbedder(args.dim))
@@ -12,10 +12,31 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+locals {
+  function_dir = "${path.module}/cloud_run_function_chat"
+  function_files = [
+    for file in fileset(local.function_dir, "**") : file
+    if !strcontains(file, "__pycache__")
+  ]
+}
+
+# the function code plus the FAQ its local fast path answers from (faq_index.py)
 data "archive_file" "function_zip" {
   type        = "zip"
-  source_dir  = "${path.module}/cloud_run_function_chat"
   output_path = "${path.module}/other/function.zip"
+
+  dynamic "source" {
+    for_each = local.function_files
+    content {
+      content  = file("${local.function_dir}/${source.value}")
+      filename = source.value
+    }
+  }
+
+  source {
+    content  = file("${path.module}/other/faq.jsonl")
+    filename = "faq.jsonl"
+  }
 }
 
 resource "google_storage_bucket_object" "code_upload" {
@@ -0,0 +1,127 @@
+# In-process cache of agent answers keyed by normalized question text
+
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+
+GLOBAL_SCOPE = "global"
+USER_SCOPE = "user"
+
+
+def normalize_question(question: str) -> str:
+    """
+    Case-fold, drop punctuation/symbols and collapse whitespace so that
+    "How can I receive my pay slip?" and "how can i receive my pay slip" match.
+    Combining marks are kept, they carry meaning in e.g. Thai script.
+    """
+    text = unicodedata.normalize("NFKC", question).casefold()
+    text = "".join(
+        " " if unicodedata.category(ch)[0] in ("P", "S") else ch for ch in text
+    )
+    return " ".join(text.split())
+
+
+class AnswerCache():
+    """
+    LRU cache of question -> answer with a TTL and a total size cap in bytes.
+
+    With ``scope="user"`` entries are keyed per user, with ``scope="global"``
+    every user shares the same answers. Answers come from a conversation, so a
+    global cache can hand one user's personal answer to another user; only use
+    it when the agent's answers never depend on who asks.
+
+    Questions shorter than ``min_chars`` once normalized ("yes", "more detail")
+    are follow-ups whose answer depends on the conversation, they are never
+    cached. Longer follow-ups still can be, which is why the cache is off by
+    default.
+    """
+
+    def __init__(
+        self,
+        scope: str = USER_SCOPE,
+        ttl_seconds: float = 3600,
+        max_bytes: int = 8 * 1024 * 1024,
+        min_chars: int = 12,
+    ):
+        if scope not in (USER_SCOPE, GLOBAL_SCOPE):
+            raise ValueError(f"Unknown answer cache scope '{scope}', expected '{USER_SCOPE}' or '{GLOBAL_SCOPE}'.")
+        self._scope = scope
+        self._ttl_seconds = ttl_seconds
+        self._max_bytes = max_bytes
+        self._min_chars = min_chars
+        self._lock = threading.Lock()
+        # (user_id or "", normalized question) -> (answer, expires_at, size)
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, user_id: str, question: str) -> tuple:
+        return (user_id if self._scope == USER_SCOPE else "", normalize_question(question))
+
+    def get(self, user_id: str, question: str) -> Optional[str]:
+        key = self._key(user_id, question)
+        if len(key[1]) < self._min_chars:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, user_id: str, question: str, answer: str):
+        key = self._key(user_id, question)
+        size = len(key[0].encode()) + len(key[1].encode()) + len(answer.encode())
+        if len(key[1]) < self._min_chars or size > self._max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (answer, time.monotonic() + self._ttl_seconds, size)
+            self._bytes += size
+            while self._bytes > self._max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: str):
+        """
+        Forget the answers given to one user (per-user scope only).
+        """
+        if self._scope != USER_SCOPE:
+            return
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                self._remove(key)
+
+    def _remove(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._bytes}
+
+
+def create_answer_cache() -> Optional[AnswerCache]:
+    """
+    Build the cache from the ANSWER_CACHE_* environment variables. Returns None
+    when ANSWER_CACHE_SCOPE is "off", the default.
+    """
+    scope = os.environ.get("ANSWER_CACHE_SCOPE", "off").lower()
+    if scope == "off":
+        return None
+    return AnswerCache(
+        scope=scope,
+        ttl_seconds=float(os.environ.get("ANSWER_CACHE_TTL_SECONDS", "3600")),
+        max_bytes=int(os.environ.get("ANSWER_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+        min_chars=int(os.environ.get("ANSWER_CACHE_MIN_CHARS", "12")),
+    )
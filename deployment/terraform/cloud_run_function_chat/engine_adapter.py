@@ -0,0 +1,95 @@
+# Async wrapper around a remote Agent Engine handle
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator
+
+
+# bounded pool for engine calls that only have a blocking client
+ENGINE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("ENGINE_MAX_WORKERS", "16")),
+    thread_name_prefix="agent-engine",
+)
+
+_DONE = object()
+
+
+class AgentEngineError(Exception):
+    """
+    A remote Agent Engine call failed, the cached handle or session may be stale.
+    """
+
+
+class AsyncEngineAdapter():
+    """
+    Exposes the Agent Engine session and query operations as coroutines.
+
+    The deployed AdkApp registers ``async_*`` variants of its operations; they
+    are used when the remote handle has them. Otherwise the blocking call runs
+    on ``ENGINE_EXECUTOR`` so the event loop keeps serving other users.
+    """
+
+    def __init__(self, remote_app: Any, executor: ThreadPoolExecutor = ENGINE_EXECUTOR):
+        self._remote_app = remote_app
+        self._executor = executor
+
+    async def _call(self, name: str, **kwargs):
+        try:
+            native = getattr(self._remote_app, f"async_{name}", None)
+            if native is not None:
+                return await native(**kwargs)
+            loop = asyncio.get_running_loop()
+            method = getattr(self._remote_app, name)
+            return await loop.run_in_executor(self._executor, lambda: method(**kwargs))
+        except Exception as e:
+            raise AgentEngineError(f"{name} failed: {e}") from e
+
+    async def list_sessions(self, user_id: str) -> dict:
+        return await self._call("list_sessions", user_id=user_id)
+
+    async def create_session(self, user_id: str) -> dict:
+        return await self._call("create_session", user_id=user_id)
+
+    async def delete_session(self, user_id: str, session_id: str):
+        return await self._call("delete_session", user_id=user_id, session_id=session_id)
+
+    async def stream_query(self, **kwargs) -> AsyncIterator[dict]:
+        """
+        Yield the events of ``stream_query`` as they arrive.
+        """
+        native = getattr(self._remote_app, "async_stream_query", None)
+        if native is not None:
+            try:
+                async for event in native(**kwargs):
+                    yield event
+            except Exception as e:
+                raise AgentEngineError(f"stream_query failed: {e}") from e
+            return
+
+        # drain the blocking generator on a pool thread and hand events back to the loop
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def produce():
+            try:
+                for event in self._remote_app.stream_query(**kwargs):
+                    loop.call_soon_threadsafe(queue.put_nowait, event)
+            except BaseException as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+
+        producer = loop.run_in_executor(self._executor, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise AgentEngineError(f"stream_query failed: {item}") from item
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            await producer
@@ -0,0 +1,100 @@
+# Process wide cache for the resolved Agent Engine handle
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Executor, Future
+from vertexai import agent_engines
+
+
+logger = logging.getLogger("Engine_cache")
+
+
+class AgentEngineCache():
+    """
+    Resolve ``agent_engines.get`` once per process and hand out the same handle
+    until it is older than ``ttl_seconds`` or ``invalidate()`` is called after a
+    failed remote call. Safe to share between threads and concurrent handlers.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600):
+        self._ttl_seconds = ttl_seconds
+        # guards the dicts below only, never held during a remote lookup
+        self._lock = threading.Lock()
+        self._handles = {}  # engine_id -> (handle, resolved_at)
+        self._resolving = {}  # engine_id -> Future of the lookup in progress
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, engine_id: str):
+        # called with the lock held, returns the fresh handle or None
+        cached = self._handles.get(engine_id)
+        if cached is None or time.monotonic() - cached[1] >= self._ttl_seconds:
+            return None
+        self.hits += 1
+        if self.hits % 100 == 0:
+            logger.info(f"Agent engine cache hits: {self.hits}, misses: {self.misses}")
+        return cached[0]
+
+    def _lookup(self, engine_id: str):
+        """
+        Return (handle, None, False) on a hit, otherwise (None, future, started):
+        the future of the lookup in progress, and whether the caller started it and
+        must run ``_resolve``. Concurrent misses share one lookup.
+        """
+        with self._lock:
+            handle = self._cached(engine_id)
+            if handle is not None:
+                return handle, None, False
+            future = self._resolving.get(engine_id)
+            if future is not None:
+                return None, future, False
+            self.misses += 1
+            future = self._resolving[engine_id] = Future()
+            return None, future, True
+
+    def _resolve(self, engine_id: str, future: Future):
+        try:
+            handle = agent_engines.get(engine_id)
+        except Exception as e:
+            with self._lock:
+                self._resolving.pop(engine_id, None)
+            future.set_exception(e)
+            return
+        with self._lock:
+            self._handles[engine_id] = (handle, time.monotonic())
+            self._resolving.pop(engine_id, None)
+        logger.info(
+            f"Resolved agent engine '{engine_id}' (cache hits: {self.hits}, misses: {self.misses})"
+        )
+        future.set_result(handle)
+
+    def get(self, engine_id: str):
+        handle, future, started = self._lookup(engine_id)
+        if handle is not None:
+            return handle
+        if started:
+            self._resolve(engine_id, future)
+        return future.result()
+
+    async def get_async(self, engine_id: str, executor: Executor):
+        """
+        ``get`` for coroutines, a miss resolves the handle on ``executor`` and
+        waits for it without blocking the event loop.
+        """
+        handle, future, started = self._lookup(engine_id)
+        if handle is not None:
+            return handle
+        if started:
+            executor.submit(self._resolve, engine_id, future)
+        return await asyncio.wrap_future(future)
+
+    def invalidate(self, engine_id: str):
+        with self._lock:
+            if self._handles.pop(engine_id, None) is not None:
+                logger.info(f"Invalidated cached agent engine '{engine_id}'")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._handles)}
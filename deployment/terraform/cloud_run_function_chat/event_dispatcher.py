@@ -0,0 +1,80 @@
+# Persistent event loop for running LINE webhook events
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Awaitable, Callable, List
+
+
+logger = logging.getLogger("Event_dispatcher")
+
+
+class EventDispatcher():
+    """
+    Runs coroutines on one long-lived event loop in a background thread.
+
+    Events submitted inside a ``batch()`` block run concurrently, events from the
+    same user run one after another in submission order, and leaving the block
+    waits until every submitted event has finished.
+    """
+
+    def __init__(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run_loop, name="event-dispatcher", daemon=True
+        )
+        self._thread.start()
+        # per user locks only ever touched from the loop thread
+        self._user_locks = {}
+        self._pending = threading.local()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    async def _run_in_order(self, user_id: str, coro_factory: Callable[[], Awaitable]):
+        # [lock, number of events queued on it] for this user
+        entry = self._user_locks.get(user_id)
+        if entry is None:
+            entry = self._user_locks[user_id] = [asyncio.Lock(), 0]
+        lock = entry[0]
+        entry[1] += 1
+        try:
+            # asyncio.Lock wakes waiters first-in first-out, keeping message order
+            async with lock:
+                return await coro_factory()
+        except Exception as e:
+            logger.exception(f"Exception while handling event from user_id: '{user_id}': {e}")
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._user_locks[user_id]
+
+    def submit(self, user_id: str, coro_factory: Callable[[], Awaitable]) -> Future:
+        """
+        Schedule ``coro_factory()`` on the loop. Inside ``batch()`` the returned
+        future is also tracked so the batch can wait for it.
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self._run_in_order(user_id, coro_factory), self._loop
+        )
+        pending: List[Future] = getattr(self._pending, "futures", None)
+        if pending is not None:
+            pending.append(future)
+        return future
+
+    @contextmanager
+    def batch(self):
+        """
+        Collect every event submitted from this thread and wait for all of them
+        when the block exits.
+        """
+        self._pending.futures = []
+        try:
+            yield
+        finally:
+            futures, self._pending.futures = self._pending.futures, None
+            for future in futures:
+                future.result()
@@ -0,0 +1,162 @@
+# Local BM25 index over the canonical FAQ, answers common questions without the agent
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import List, Optional
+import numpy as np
+from answer_cache import normalize_question
+
+
+logger = logging.getLogger("Faq_index")
+
+DEFAULT_FAQ_PATHS = [
+    # deployed, terraform adds terraform/other/faq.jsonl to the function archive
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "faq.jsonl"),
+    # local development, the function directory sits next to terraform/other
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "other", "faq.jsonl"),
+]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Words of the normalized text, plus character bigrams for non-ASCII words
+    since scripts such as Thai do not separate words with spaces.
+    """
+    tokens = []
+    for word in normalize_question(text).split():
+        tokens.append(word)
+        if not word.isascii() and len(word) > 2:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+class FaqMatch():
+    def __init__(self, question: str, answer: str, confidence: float, latency_us: float):
+        self.question = question
+        self.answer = answer
+        self.confidence = confidence
+        self.latency_us = latency_us
+
+
+class FaqIndex():
+    """
+    BM25 over ``faq_question`` of a faq.jsonl file, scored with NumPy.
+
+    The file is read on the first lookup and re-read when its modification time
+    changes; when it cannot be read or parsed the previous index keeps serving.
+    Entries are ranked by BM25; ``confidence`` of the best one is the IDF-weighted
+    F1 of the terms shared by the query and the FAQ question, so 1.0 means both
+    use the same terms and extra or missing words lower it. It is 0 when the
+    query lacks a key term of the FAQ question, one whose IDF is at least the
+    median of the vocabulary: "What is the policy?" does not match "What is the
+    return policy?".
+    """
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75, reload_check_seconds: float = 5.0):
+        self._path = path
+        self._k1 = k1
+        self._b = b
+        self._reload_check_seconds = reload_check_seconds
+        self._lock = threading.Lock()
+        self._loaded_mtime = None
+        self._next_check = 0.0
+        self._vocab = {}
+        self._faqs = []
+        self._weights = None  # docs x vocab BM25 term weights
+        self._idf = None
+        self._doc_idf_mass = None  # sum of idf over each question's distinct terms
+        self._key_terms = []  # per question, vocab columns the query must contain
+
+    def _build(self):
+        faqs = []
+        with open(self._path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    item = json.loads(line)
+                    faqs.append((item["faq_question"], item["faq_answer"]))
+
+        docs = [tokenize(question) for question, _ in faqs]
+        vocab = {}
+        for tokens in docs:
+            for token in tokens:
+                vocab.setdefault(token, len(vocab))
+
+        tf = np.zeros((len(docs), max(len(vocab), 1)), dtype=np.float32)
+        for row, tokens in enumerate(docs):
+            for token in tokens:
+                tf[row, vocab[token]] += 1
+
+        n_docs = len(docs)
+        df = np.count_nonzero(tf, axis=0)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        doc_len = tf.sum(axis=1, keepdims=True)
+        avg_len = max(float(doc_len.mean()) if n_docs else 0.0, 1.0)
+        norm = self._k1 * (1 - self._b + self._b * doc_len / avg_len)
+        # query independent part of BM25, a lookup only sums the query's columns
+        weights = idf * tf * (self._k1 + 1) / (tf + norm)
+
+        self._vocab, self._faqs, self._weights, self._idf = vocab, faqs, weights, idf
+        self._doc_idf_mass = ((tf > 0) * idf).sum(axis=1)
+        key = (tf > 0) & (idf >= np.median(idf))
+        self._key_terms = [set(np.flatnonzero(row).tolist()) for row in key]
+        logger.info(f"Loaded {n_docs} FAQ entries from '{self._path}'")
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if self._loaded_mtime is not None and now < self._next_check:
+            return
+        with self._lock:
+            if self._loaded_mtime is not None and now < self._next_check:
+                return
+            self._next_check = now + self._reload_check_seconds
+            try:
+                mtime = os.stat(self._path).st_mtime
+                if mtime != self._loaded_mtime:
+                    self._build()
+                    self._loaded_mtime = mtime
+            except Exception as e:
+                # e.g. a half written or deleted file, keep answering from the last good index
+                logger.warning(f"Could not load FAQ from '{self._path}', keeping the previous index: {e}")
+
+    def lookup(self, question: str) -> Optional[FaqMatch]:
+        """
+        Return the best matching FAQ entry, None when no query term is known.
+        """
+        start = time.perf_counter()
+        self._maybe_reload()
+        vocab, faqs, weights, idf = self._vocab, self._faqs, self._weights, self._idf
+        tokens = set(tokenize(question))
+        columns = [vocab[token] for token in tokens if token in vocab]
+        if not columns or not faqs:
+            return None
+        scores = weights[:, columns].sum(axis=1)
+        best = int(np.argmax(scores))
+
+        # terms unknown to the index get the highest possible idf
+        unseen_idf = float(np.log1p((len(faqs) + 0.5) / 0.5))
+        query_mass = float(idf[columns].sum()) + unseen_idf * (len(tokens) - len(columns))
+        shared = weights[best, columns] > 0
+        overlap = float(idf[columns][shared].sum())
+        confidence = 2 * overlap / (query_mass + float(self._doc_idf_mass[best]))
+        if not self._key_terms[best] <= set(columns):
+            confidence = 0.0
+        latency_us = (time.perf_counter() - start) * 1_000_000
+        return FaqMatch(faqs[best][0], faqs[best][1], confidence, latency_us)
+
+
+def create_faq_index() -> Optional[FaqIndex]:
+    """
+    Index FAQ_PATH (or the first default location that exists). Returns None
+    when no FAQ file is available or FAQ_FASTPATH is "off", the default.
+    """
+    if os.environ.get("FAQ_FASTPATH", "off").lower() == "off":
+        return None
+    paths = [os.environ["FAQ_PATH"]] if os.environ.get("FAQ_PATH") else DEFAULT_FAQ_PATHS
+    for path in paths:
+        if os.path.exists(path):
+            return FaqIndex(path, reload_check_seconds=float(os.environ.get("FAQ_RELOAD_CHECK_SECONDS", "5")))
+    logger.warning(f"No faq.jsonl found in {paths}, FAQ fast path disabled")
+    return None
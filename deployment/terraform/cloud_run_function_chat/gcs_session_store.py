@@ -0,0 +1,207 @@
+# Write-behind store for the per-user session counters kept in GCS
+
+import asyncio
+import atexit
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from google.api_core import exceptions
+from storage_pool import get_bucket
+from session_store import SessionStore
+
+
+logger = logging.getLogger("Session_store")
+
+
+class _Entry():
+    def __init__(self, data: dict, generation: int):
+        self.data = data
+        # generation of the GCS object `data` is based on, 0 when it does not exist yet
+        self.generation = generation
+        # increments not yet written, re-applied on top of the remote value on conflict
+        self.delta = 0
+        # a put() replaced the value, the remote value is not merged
+        self.overwrite = False
+        self.dirty = False
+        self.loaded_at = time.monotonic()
+
+
+class WriteBehindSessionStore(SessionStore):
+    """
+    Keeps session dicts ({"user_id", "session_count"}) in memory and writes them
+    back to ``gs://bucket/prefix/<user_id>.json`` in the background.
+
+    Reads are served from memory, increments are coalesced into one upload per
+    flush, and every upload carries an ``if_generation_match`` precondition so
+    two instances updating the same user merge their increments instead of
+    overwriting each other.
+    """
+
+    def __init__(
+        self,
+        bucket_name: str,
+        prefix: str,
+        flush_interval_seconds: float = 5.0,
+        cache_ttl_seconds: float = 300.0,
+        max_entries: int = 10000,
+        max_batch_size: int = 32,
+    ):
+        self._bucket = get_bucket(bucket_name)
+        self._prefix = prefix
+        self._cache_ttl_seconds = cache_ttl_seconds
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._pool = ThreadPoolExecutor(max_workers=max_batch_size, thread_name_prefix="session-store")
+        self._max_batch_size = max_batch_size
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_periodically,
+            args=(flush_interval_seconds,),
+            name="session-store-flush",
+            daemon=True,
+        )
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def _blob(self, user_id: str):
+        return self._bucket.blob(f"{self._prefix}/{user_id}.json")
+
+    def _download(self, user_id: str):
+        """
+        Return (data, generation) of the stored session, ({}, 0) when missing.
+        """
+        blob = self._blob(user_id)
+        try:
+            data = json.loads(blob.download_as_text())
+        except exceptions.NotFound:
+            return {}, 0
+        return data, blob.generation
+
+    async def get(self, user_id: str) -> dict:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and (
+                entry.dirty or time.monotonic() - entry.loaded_at < self._cache_ttl_seconds
+            ):
+                self._entries.move_to_end(user_id)
+                return dict(entry.data)
+
+        data, generation = await asyncio.to_thread(self._download, user_id)
+        data = {"user_id": user_id, "session_count": data.get("session_count", 0)}
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry.dirty:
+                # a write raced with the download, keep the local value
+                return dict(entry.data)
+            self._entries[user_id] = _Entry(data, generation)
+            self._entries.move_to_end(user_id)
+            self._evict()
+        return dict(data)
+
+    async def put(self, user_id: str, data: dict):
+        await self.get(user_id)
+        with self._lock:
+            entry = self._entries[user_id]
+            entry.data = dict(data)
+            entry.delta = 0
+            entry.overwrite = True
+            entry.dirty = True
+
+    async def incr(self, user_id: str, amount: int = 1) -> int:
+        await self.get(user_id)
+        with self._lock:
+            entry = self._entries[user_id]
+            entry.data["session_count"] = entry.data.get("session_count", 0) + amount
+            entry.delta += amount
+            entry.dirty = True
+            return entry.data["session_count"]
+
+    def _evict(self):
+        # only clean entries can go, dirty ones still have to be written
+        for user_id in list(self._entries):
+            if len(self._entries) <= self._max_entries:
+                break
+            if not self._entries[user_id].dirty:
+                del self._entries[user_id]
+
+    def _write(self, user_id: str, data: dict, generation: int, delta: int, overwrite: bool):
+        """
+        Upload one entry, merging with the remote value when another writer got
+        there first. Returns the (data, generation) that ended up in GCS.
+        """
+        for _ in range(5):
+            blob = self._blob(user_id)
+            try:
+                blob.upload_from_string(
+                    json.dumps(data),
+                    content_type="application/json",
+                    if_generation_match=generation,
+                )
+                return data, blob.generation
+            except exceptions.PreconditionFailed:
+                remote, generation = self._download(user_id)
+                if not overwrite:
+                    data = dict(data, session_count=remote.get("session_count", 0) + delta)
+        raise RuntimeError(f"Too many concurrent updates to session of user_id: '{user_id}'")
+
+    def flush(self):
+        """
+        Write every dirty entry to GCS, in batches of ``max_batch_size`` parallel uploads.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending = []
+                for user_id, entry in self._entries.items():
+                    if entry.dirty:
+                        pending.append((user_id, dict(entry.data), entry.generation, entry.delta, entry.overwrite))
+                        entry.delta = 0
+                        entry.overwrite = False
+                        entry.dirty = False
+            if not pending:
+                return
+
+            for start in range(0, len(pending), self._max_batch_size):
+                batch = pending[start:start + self._max_batch_size]
+                futures = [self._pool.submit(self._write, *item) for item in batch]
+                for (user_id, _, _, delta, overwrite), future in zip(batch, futures):
+                    with self._lock:
+                        entry = self._entries.get(user_id)
+                    try:
+                        written, generation = future.result()
+                    except Exception as e:
+                        logger.warning(f"Failed to flush session of user_id: '{user_id}': {e}")
+                        # keep the change for the next flush
+                        with self._lock:
+                            if entry is not None and not entry.overwrite:
+                                entry.delta += delta
+                                entry.overwrite = overwrite
+                                entry.dirty = True
+                        continue
+                    with self._lock:
+                        if entry is None:
+                            continue
+                        entry.generation = generation
+                        entry.loaded_at = time.monotonic()
+                        if not entry.overwrite:
+                            # increments made while uploading stay on top of the merged value
+                            entry.data = dict(written, session_count=written.get("session_count", 0) + entry.delta)
+            logger.info(f"Flushed {len(pending)} session(s) to GCS")
+
+    def _flush_periodically(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.exception(f"Session store flush failed: {e}")
+
+    def close(self):
+        """
+        Stop the background flusher and write out everything still pending.
+        """
+        self._stop.set()
+        self.flush()
@@ -1,5 +1,4 @@
 import os
-import asyncio
 from dotenv import load_dotenv
 from flask import Request, Response
 from linebot.v3 import WebhookHandler
@@ -13,6 +12,7 @@ from linebot.v3.messaging import (
     TextMessage,
 )
 from session_handler import SessionHandler
+from event_dispatcher import EventDispatcher
 import logging
 from google.cloud import secretmanager
 import google
@@ -54,13 +54,19 @@ get_channel_secret = get_secret_value('CHANNEL_SECRET')
 configuration = Configuration(access_token=get_access_token)
 handler = WebhookHandler(channel_secret=get_channel_secret)
 BOT = SessionHandler()
+# one event loop per process, shared by every webhook request
+DISPATCHER = EventDispatcher()
 
 @handler.add(MessageEvent, message=TextMessageContent)
 def handle_message(event: MessageEvent):
     print("Handler called!")
     logger.info("Handler called!")
     try:
-        asyncio.run(BOT.on_message_activity(event, configuration))
+        # runs concurrently with the other events of this payload, in order per user
+        DISPATCHER.submit(
+            event.source.user_id,
+            lambda: BOT.on_message_activity(event, configuration),
+        )
     except Exception as e:
         print("Exception in handle_message:", e)
 
@@ -72,7 +78,9 @@ def bot_webhook(request: Request) -> Response:
         x_line_signature = request.headers.get('X-Line-Signature', None)
         body_str = request.get_data(as_text=True)
         try:
-            handler.handle(body_str, x_line_signature)
+            # returns once every event in the payload has been handled
+            with DISPATCHER.batch():
+                handler.handle(body_str, x_line_signature)
             logger.info("reach Handler called!")
         except InvalidSignatureError:
             print("Invalid Signature. Check secret or signature mismatch.")
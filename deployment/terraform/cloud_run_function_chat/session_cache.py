@@ -0,0 +1,63 @@
+# In-process cache of the Agent Engine session in use by each user
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class SessionIdCache():
+    """
+    Bounded LRU map of user_id -> (session_id, lastUpdateTime).
+
+    Filled from ``create_session``/``list_sessions`` results and invalidated on
+    restart, so a returning user does not need a ``list_sessions`` round trip.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    def get(self, user_id: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+            return entry
+
+    def put(self, user_id: str, session_id: str, last_update_time: Optional[float] = None):
+        with self._lock:
+            self._entries[user_id] = (
+                session_id,
+                last_update_time if last_update_time is not None else time.time(),
+            )
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def put_session(self, user_id: str, session: dict):
+        """
+        Store a session dict as returned by ``create_session`` or ``list_sessions``.
+        """
+        self.put(
+            user_id,
+            session["id"],
+            session.get("lastUpdateTime", session.get("last_update_time")),
+        )
+
+    def touch(self, user_id: str):
+        """
+        Record activity on the cached session, mirroring Agent Engine's lastUpdateTime.
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries[user_id] = (entry[0], time.time())
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def __len__(self):
+        return len(self._entries)
@@ -4,8 +4,14 @@ import os
 import json
 import time
 from datetime import datetime, timedelta
+from dataclasses import dataclass
 from session_state import SessionState
-from vertexai import agent_engines
+from engine_cache import AgentEngineCache
+from session_cache import SessionIdCache
+from engine_adapter import AsyncEngineAdapter, AgentEngineError, ENGINE_EXECUTOR
+from answer_cache import create_answer_cache
+from faq_index import create_faq_index
+from session_reaper import SessionReaper
 import logging
 import asyncio
 from abc import ABC, abstractmethod
@@ -15,8 +21,8 @@ from linebot.v3.webhooks import MessageEvent, MessageContent
 from aiohttp import web
 
 from linebot.v3.messaging import (
-    ApiClient, 
-    MessagingApi, 
+    AsyncApiClient,
+    AsyncMessagingApi,
     Configuration, 
     ReplyMessageRequest, 
     TextMessage, 
@@ -35,12 +41,67 @@ logging.basicConfig(
 logging.getLogger("aiohttp.access").setLevel(logging.WARNING)
 logger = logging.getLogger("Session_handler")
 
+# shared by every SessionHandler in the process, refreshed on TTL or on error
+ENGINE_CACHE = AgentEngineCache(
+    ttl_seconds=float(os.environ.get("ENGINE_CACHE_TTL_SECONDS", "3600"))
+)
+# user_id -> (session_id, lastUpdateTime), saves the list_sessions call per message
+SESSION_CACHE = SessionIdCache(
+    max_entries=int(os.environ.get("SESSION_CACHE_MAX_ENTRIES", "10000"))
+)
+# question -> answer, ANSWER_CACHE_SCOPE is off (default), user or global
+ANSWER_CACHE = create_answer_cache()
+# canonical FAQ answered locally when the match confidence reaches FAQ_CONFIDENCE_THRESHOLD,
+# FAQ_FASTPATH is off (default) or on
+FAQ_INDEX = create_faq_index()
+FAQ_CONFIDENCE_THRESHOLD = float(os.environ.get("FAQ_CONFIDENCE_THRESHOLD", "0.8"))
+# the agent keeps its prompt within HISTORY_TOKEN_BUDGET, so sessions are no longer
+# reset after a number of turns by default; 0 disables either limit
+SESSION_MAX_TURNS = int(os.environ.get("SESSION_MAX_TURNS", "0"))
+SESSION_MAX_AGE_SECONDS = float(os.environ.get("SESSION_MAX_AGE_HOURS", "24")) * 60 * 60
+# replaced sessions are deleted in the background, the reply does not wait for it
+SESSION_REAPER = SessionReaper()
+# LINE limits of a reply: 5 messages, 5000 characters per text message
+MAX_REPLY_MESSAGES = 5
+MAX_TEXT_LENGTH = 5000
+ENGINE_ERROR_REPLY = "Agent Engine not responding, Please Contact IT Team"
+
+
+def split_reply(text: str) -> list:
+    """
+    Split an answer into at most MAX_REPLY_MESSAGES texts of MAX_TEXT_LENGTH
+    characters, at a line break or space when there is one. The end of longer
+    answers is cut off.
+    """
+    parts = []
+    while text and len(parts) < MAX_REPLY_MESSAGES:
+        if len(text) <= MAX_TEXT_LENGTH:
+            parts.append(text)
+            break
+        if len(parts) == MAX_REPLY_MESSAGES - 1:
+            parts.append(text[:MAX_TEXT_LENGTH - 1] + "…")
+            break
+        cut = max(text.rfind("\n", 0, MAX_TEXT_LENGTH), text.rfind(" ", 0, MAX_TEXT_LENGTH))
+        if cut <= 0:
+            cut = MAX_TEXT_LENGTH
+        parts.append(text[:cut])
+        text = text[cut:].lstrip()
+    return parts
 
-# session management class
+
+# per message state, one instance per on_message_activity call
+@dataclass
+class MessageContext():
+    event: MessageEvent
+    remote_app: AsyncEngineAdapter
+    session_state: SessionState
+    user_id: str
+
+
+# session management class, holds no per-user state so one instance can serve
+# many users concurrently
 class SessionHandler():
     def __init__(self):
-        self._userState = None
-        self._sessionState = None
         self._remote_agent_engine_id = os.environ.get("REMOTE_AGENT_ENGINE_ID", "")
                 
     async def get_remote_app(self):
@@ -48,96 +109,158 @@ class SessionHandler():
             raise ValueError("REMOTE_AGENT_ENGINE_ID environment variable is not set.")
         
         engine_id = self._remote_agent_engine_id.split("/")[-1]
-        self.remote_app = agent_engines.get(engine_id)  
+        # a miss resolves the handle on a pool thread, not on the shared event loop
+        remote_app = await ENGINE_CACHE.get_async(engine_id, ENGINE_EXECUTOR)
+        logger.debug(f"Agent engine cache stats: {ENGINE_CACHE.stats()}")
+        return remote_app
 
-    async def restart_session(self, session_id: str, user_id: str, session_user_state: SessionState):
+    def invalidate_remote_app(self):
         """
-        Restart the session by deleting and creating a new one.
+        Drop the cached engine handle so the next message resolves it again.
         """
+        ENGINE_CACHE.invalidate(self._remote_agent_engine_id.split("/")[-1])
+
+    async def get_session(self, ctx: MessageContext):
+        """
+        Return (session_id, lastUpdateTime) of the user's current session, from the
+        local cache when possible, otherwise from Agent Engine (creating one if needed).
+        """
+        cached = SESSION_CACHE.get(ctx.user_id)
+        if cached is not None:
+            return cached
+
+        sessions = (await ctx.remote_app.list_sessions(user_id=ctx.user_id))["sessions"]
+        # if not have sessions, create one
+        if len(sessions) == 0:
+            # print("REASON: Session does not exist, creating a new session...")
+            SESSION_CACHE.put_session(ctx.user_id, await ctx.remote_app.create_session(user_id=ctx.user_id))
+        else:
+            SESSION_CACHE.put_session(ctx.user_id, sessions[-1])
+        return SESSION_CACHE.get(ctx.user_id)
+
+    async def restart_session(self, ctx: MessageContext, session_id: str):
+        """
+        Restart the session by creating a new one and deleting the old one in the
+        background.
+        Returns the id of the new session.
+        """
+        user_id = ctx.user_id
         # agent engine restart
-        self.remote_app.delete_session(session_id=session_id, user_id=user_id)
-        self.remote_app.create_session(user_id=user_id)
+        SESSION_CACHE.invalidate(user_id)
+        SESSION_REAPER.delete_later(ctx.remote_app, session_id, user_id)
+        new_session = await ctx.remote_app.create_session(user_id=user_id)
+        SESSION_CACHE.put_session(user_id, new_session)
+        logger.info(f"Session reaper stats: {SESSION_REAPER.stats()}")
 
         # line bot session restart
-        self._userState.session_count = 0
-        session_user_state.cache_question_response = {}
-        await self._sessionState.save_session(user_id, {"user_id": user_id, "session_count": self._userState.session_count})
-        return None
+        ctx.session_state.session_count = 0
+        if ANSWER_CACHE is not None:
+            ANSWER_CACHE.invalidate_user(user_id)
+        await ctx.session_state.save_session(user_id, {"user_id": user_id, "session_count": ctx.session_state.session_count})
+        return new_session["id"]
     
     async def on_message_activity(self, lineEvent: MessageEvent, configuration: Configuration):
         logger.info("entering on_message_activity successfully")
         # turn on engine
-        await self.get_remote_app()
-
-        # fetch session meta data | 1..user_id 2.session_count
-        self._sessionState = SessionState(lineEvent)
-        self._userState = await self._sessionState.load_session()
+        remote_app = await self.get_remote_app()
+        try:
+            # fetch session meta data | 1..user_id 2.session_count
+            session_state = await SessionState(lineEvent).load_session()
+            ctx = MessageContext(
+                event=lineEvent,
+                remote_app=AsyncEngineAdapter(remote_app),
+                session_state=session_state,
+                user_id=session_state.user_id,
+            )
+            await self._handle_message(ctx, configuration)
+        except AgentEngineError:
+            # the handle or session may be stale (engine redeployed/deleted), refresh them next time
+            self.invalidate_remote_app()
+            SESSION_CACHE.invalidate(lineEvent.source.user_id)
+            raise
 
-        with ApiClient(configuration) as api_client:
-            line_bot_api = MessagingApi(api_client)
+    async def _handle_message(self, ctx: MessageContext, configuration: Configuration):
+        lineEvent = ctx.event
+        # async LINE client, a reply must not block the loop shared by every user
+        async with AsyncApiClient(configuration) as api_client:
+            line_bot_api = AsyncMessagingApi(api_client)
             # Agent engine management
             user_question = lineEvent.message.text
             if user_question:
-                user_id = self._userState.user_id
-                sessions = self.remote_app.list_sessions(user_id=user_id)
+                user_id = ctx.user_id
 
-                # if not have sessions, create one
-                if len(sessions["sessions"]) == 0:
-                    # print("REASON: Session does not exist, creating a new session...")
-                    self.remote_app.create_session(user_id=user_id)
-                    sessions = self.remote_app.list_sessions(user_id=user_id)
+                # repeated question, answer from memory without calling the agent
+                cached_answer = ANSWER_CACHE.get(user_id, user_question) if ANSWER_CACHE is not None else None
+                if cached_answer is not None:
+                    await line_bot_api.reply_message(
+                        ReplyMessageRequest(
+                            reply_token=lineEvent.reply_token,
+                            messages=[TextMessage(text=text) for text in split_reply(cached_answer)]
+                        )
+                    )
+                    logger.info(f"Question: '{user_question}', Answer (cached): '{cached_answer}', from user_id: '{user_id}', cache: {ANSWER_CACHE.stats()}")
+                    return
 
+                # canonical FAQ question, answer from the local index
+                faq_match = FAQ_INDEX.lookup(user_question) if FAQ_INDEX is not None else None
+                if faq_match is not None:
+                    logger.info(f"FAQ lookup took {faq_match.latency_us:.1f} us, confidence {faq_match.confidence:.2f} for '{faq_match.question}'")
+                    if faq_match.confidence >= FAQ_CONFIDENCE_THRESHOLD:
+                        await line_bot_api.reply_message(
+                            ReplyMessageRequest(
+                                reply_token=lineEvent.reply_token,
+                                messages=[TextMessage(text=text) for text in split_reply(faq_match.answer)]
+                            )
+                        )
+                        logger.info(f"Question: '{user_question}', Answer (FAQ): '{faq_match.answer}', from user_id: '{user_id}'")
+                        return
 
                 # get existsing session id
-                session_id = sessions["sessions"][-1]["id"]
+                session_id, lastUpdateTime = await self.get_session(ctx)
 
                 # perform date check
-                lastUpdateTime = sessions["sessions"][-1]["lastUpdateTime"]
-                seconds_since_last_update = time.time() - lastUpdateTime
-                days_since_last_update = seconds_since_last_update / (60 * 60 * 24)
-
-                if days_since_last_update > 1:
-                    # print("REASON: Session is older than 1 day, creating a new session...")
-                    await self.restart_session(session_id=session_id, user_id=user_id, session_user_state=self._sessionState)
-                    sessions = self.remote_app.list_sessions(user_id=user_id)
-                    session_id = sessions["sessions"][-1]["id"]
-                    
-                if self._userState.session_count > 5:
-                    await self.restart_session(session_id=session_id, user_id=user_id, session_user_state=self._sessionState)
-                    sessions = self.remote_app.list_sessions(user_id=user_id)
-                    session_id = sessions["sessions"][-1]["id"]
-
-                for engineEvent in self.remote_app.stream_query(
+                if SESSION_MAX_AGE_SECONDS and time.time() - lastUpdateTime > SESSION_MAX_AGE_SECONDS:
+                    # another instance may have used the session since we cached it, confirm remotely
+                    SESSION_CACHE.invalidate(user_id)
+                    session_id, lastUpdateTime = await self.get_session(ctx)
+
+                    if time.time() - lastUpdateTime > SESSION_MAX_AGE_SECONDS:
+                        session_id = await self.restart_session(ctx, session_id)
+
+                if SESSION_MAX_TURNS and ctx.session_state.session_count > SESSION_MAX_TURNS:
+                    session_id = await self.restart_session(ctx, session_id)
+
+                # collect the streamed events, a reply token can only be used once
+                texts = []
+                async for engineEvent in ctx.remote_app.stream_query(
                     user_id=user_id,
                     session_id=session_id,
                     message=user_question,
                 ):
                     if engineEvent.get("content", None):
-                        self._userState.session_count  += 1
-                        await self._sessionState.save_session(user_id, {
-                            "user_id": user_id,
-                            "session_count": self._userState.session_count
-                        })
-                        # print(sessions)
-                        # print(f"session_user_state.count_messages : {session_user_state.count_messages}")
-                        line_bot_api.reply_message(
-                            ReplyMessageRequest(
-                                reply_token=lineEvent.reply_token,
-                                messages=[TextMessage(text=f"{engineEvent['content']['parts'][-1]['text']}")]
-                            )
+                        texts.extend(
+                            part["text"] for part in engineEvent["content"].get("parts", [])
+                            if part.get("text") and not part.get("thought")
                         )
-                        logger.info(f"Question: '{user_question}', Answer: '{engineEvent['content']['parts'][-1]['text']}', from user_id: '{user_id}'")
-
                     else:
-                        line_bot_api.reply_message(
+                        await line_bot_api.reply_message(
                             ReplyMessageRequest(
                                 reply_token=lineEvent.reply_token,
-                                messages=[TextMessage(text='Agent Engine not responding, Please Contact IT Team')]
+                                messages=[TextMessage(text=ENGINE_ERROR_REPLY)]
                             )
                         )
-                        raise Exception(
+                        raise AgentEngineError(
                             f"Error: {engineEvent.get('error', 'Agent Engine not responding')}"
                         )
-            
-
-
+                answer = "\n".join(text.strip() for text in texts if text.strip())
+                await line_bot_api.reply_message(
+                    ReplyMessageRequest(
+                        reply_token=lineEvent.reply_token,
+                        messages=[TextMessage(text=text) for text in split_reply(answer or ENGINE_ERROR_REPLY)]
+                    )
+                )
+                await ctx.session_state.increment_session()
+                logger.info(f"Question: '{user_question}', Answer: '{answer}', from user_id: '{user_id}'")
+                SESSION_CACHE.touch(user_id)
+                if answer and ANSWER_CACHE is not None:
+                    ANSWER_CACHE.put(user_id, user_question, answer)
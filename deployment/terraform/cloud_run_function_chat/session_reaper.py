@@ -0,0 +1,46 @@
+# Deletes replaced Agent Engine sessions in the background, off the reply path
+
+import asyncio
+import logging
+
+
+logger = logging.getLogger("Session_reaper")
+
+
+class SessionReaper():
+    """
+    Background deletion of sessions replaced by restart_session.
+
+    The reply does not wait for ``delete_session``; failures are only logged and
+    counted, a session that could not be deleted is no longer used since the
+    user's newer session is listed after it.
+    """
+
+    def __init__(self):
+        # background tasks are referenced until done, the loop only keeps weak references
+        self._tasks = set()
+        self.deleted = 0
+        self.failed = 0
+
+    def delete_later(self, remote_app, session_id: str, user_id: str):
+        """
+        Delete a session in the background.
+        """
+        task = asyncio.get_running_loop().create_task(self._delete(remote_app, session_id, user_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _delete(self, remote_app, session_id: str, user_id: str):
+        try:
+            await remote_app.delete_session(session_id=session_id, user_id=user_id)
+            self.deleted += 1
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"Could not delete session '{session_id}' of user_id: '{user_id}': {e}")
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._tasks),
+            "deleted": self.deleted,
+            "failed": self.failed,
+        }
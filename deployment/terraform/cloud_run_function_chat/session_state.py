@@ -1,13 +1,11 @@
-# GCS Utility
-from google.cloud import storage
+# Per-user session state backed by the configured SessionStore
+from session_store import create_session_store
 import json
 import os
 from linebot.v3 import WebhookHandler
 from linebot.v3.exceptions import InvalidSignatureError
 from linebot.v3.webhooks import MessageEvent, MessageContent
 from aiohttp import web
-import google
-import vertexai
 
 from linebot.v3.messaging import (
     ApiClient, 
@@ -20,43 +18,29 @@ from linebot.v3.messaging import (
 )
 
 from typing import Optional
-credentials, project_id = google.auth.default()
 
-GCS_BUCKET = f"{project_id}-linebot-line_bot_session-store"
-GCS_PREFIX = "sessions"
+# process wide store, backend chosen by SESSION_STORE_BACKEND (gcs, sqlite or memory)
+SESSION_STORE = create_session_store()
 
 
 class SessionState:
-    def __init__(self, event: MessageEvent, user_id=None, session_count=0, cache_question_response = dict()):
+    def __init__(self, event: MessageEvent, user_id=None, session_count=0):
         self.event = event
         self.user_id = user_id if user_id is not None else event.source.user_id
         self.session_count = session_count
-        self.cache_question_response = dict()
-
-    def get_gcs_client(self):
-        return storage.Client()
-
-    async def get_session_blob(self, user_id):
-        client = self.get_gcs_client()
-        bucket = client.bucket(GCS_BUCKET)
-        blob = bucket.blob(f"{GCS_PREFIX}/{user_id}.json")
-        return blob
 
     async def load_session(self):
-        blob = await self.get_session_blob(self.user_id)
-        if blob.exists():
-            data = json.loads(blob.download_as_text())
-            self.user_id = data.get("user_id", self.user_id)
-            self.session_count = data.get("session_count", 0)
-        else:
-            data = {
-                "user_id": self.user_id,
-                "session_count": 0
-            }
-            await self.save_session(self.user_id, data)
-            self.session_count = 0
+        data = await SESSION_STORE.get(self.user_id)
+        self.user_id = data.get("user_id", self.user_id)
+        self.session_count = data.get("session_count", 0)
         return self
 
     async def save_session(self, user_id, session_dict) -> Optional[str]:
-        blob = await self.get_session_blob(user_id)
-        blob.upload_from_string(json.dumps(session_dict), content_type="application/json")
+        await SESSION_STORE.put(user_id, session_dict)
+
+    async def increment_session(self, amount: int = 1) -> int:
+        """
+        Add to the user's session_count, the write is coalesced by the store.
+        """
+        self.session_count = await SESSION_STORE.incr(self.user_id, amount)
+        return self.session_count
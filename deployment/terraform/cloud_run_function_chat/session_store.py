@@ -0,0 +1,173 @@
+# Pluggable backends for the per-user session dicts ({"user_id", "session_count"})
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+
+class SessionStore(ABC):
+    """
+    Async key-value store of session dicts keyed by user_id.
+    """
+
+    @abstractmethod
+    async def get(self, user_id: str) -> dict:
+        """
+        Return the user's session dict, ``{"user_id": user_id, "session_count": 0}`` if unknown.
+        """
+
+    @abstractmethod
+    async def put(self, user_id: str, data: dict):
+        """
+        Replace the user's session dict.
+        """
+
+    @abstractmethod
+    async def incr(self, user_id: str, amount: int = 1) -> int:
+        """
+        Add ``amount`` to the user's session_count and return the new value.
+        """
+
+    def close(self):
+        """
+        Release resources and persist anything still buffered.
+        """
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Bounded in-process LRU, for tests and single instance deployments.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+
+    def _entry(self, user_id: str) -> dict:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            entry = self._entries[user_id] = {"user_id": user_id, "session_count": 0}
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        self._entries.move_to_end(user_id)
+        return entry
+
+    async def get(self, user_id: str) -> dict:
+        with self._lock:
+            return dict(self._entry(user_id))
+
+    async def put(self, user_id: str, data: dict):
+        with self._lock:
+            self._entry(user_id)
+            self._entries[user_id] = dict(data)
+
+    async def incr(self, user_id: str, amount: int = 1) -> int:
+        with self._lock:
+            entry = self._entry(user_id)
+            entry["session_count"] = entry.get("session_count", 0) + amount
+            return entry["session_count"]
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    Local SQLite database in WAL mode, persistent across restarts of one node.
+
+    Statements run on a thread via ``asyncio.to_thread``: another process on the
+    node may hold the write lock, and waiting for it (up to ``timeout`` seconds)
+    must not stall the event loop shared by every user.
+    """
+
+    def __init__(self, path: str, timeout: float = 5.0):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (user_id TEXT PRIMARY KEY, data TEXT NOT NULL)"
+        )
+
+    def _read(self, user_id: str) -> dict:
+        row = self._conn.execute("SELECT data FROM sessions WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return {"user_id": user_id, "session_count": 0}
+        return json.loads(row[0])
+
+    def _write(self, user_id: str, data: dict):
+        self._conn.execute(
+            "INSERT INTO sessions (user_id, data) VALUES (?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data",
+            (user_id, json.dumps(data)),
+        )
+
+    def _get(self, user_id: str) -> dict:
+        with self._lock:
+            return self._read(user_id)
+
+    def _put(self, user_id: str, data: dict):
+        with self._lock:
+            self._write(user_id, data)
+
+    def _incr(self, user_id: str, amount: int) -> int:
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, other processes on the node wait for it
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                data = self._read(user_id)
+                data["session_count"] = data.get("session_count", 0) + amount
+                self._write(user_id, data)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return data["session_count"]
+
+    async def get(self, user_id: str) -> dict:
+        return await asyncio.to_thread(self._get, user_id)
+
+    async def put(self, user_id: str, data: dict):
+        await asyncio.to_thread(self._put, user_id, data)
+
+    async def incr(self, user_id: str, amount: int = 1) -> int:
+        return await asyncio.to_thread(self._incr, user_id, amount)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_session_store(backend: str = None) -> SessionStore:
+    """
+    Build the store named by ``backend`` or the SESSION_STORE_BACKEND environment
+    variable: "gcs" (default), "sqlite" or "memory".
+    """
+    backend = (backend or os.environ.get("SESSION_STORE_BACKEND", "gcs")).lower()
+    if backend == "memory":
+        return MemorySessionStore(
+            max_entries=int(os.environ.get("SESSION_STORE_MAX_ENTRIES", "10000"))
+        )
+    if backend == "sqlite":
+        return SqliteSessionStore(
+            os.environ.get("SESSION_STORE_SQLITE_PATH", "/tmp/line_bot_sessions.db"),
+            timeout=float(os.environ.get("SESSION_STORE_SQLITE_TIMEOUT_SECONDS", "5")),
+        )
+    if backend == "gcs":
+        # only the GCS backend needs cloud libraries and credentials
+        import google.auth
+        from gcs_session_store import WriteBehindSessionStore
+
+        bucket_name = os.environ.get("SESSION_STORE_GCS_BUCKET")
+        if not bucket_name:
+            _, project_id = google.auth.default()
+            bucket_name = f"{project_id}-linebot-line_bot_session-store"
+        return WriteBehindSessionStore(
+            bucket_name=bucket_name,
+            prefix=os.environ.get("SESSION_STORE_GCS_PREFIX", "sessions"),
+            flush_interval_seconds=float(os.environ.get("SESSION_STORE_FLUSH_SECONDS", "5")),
+            max_entries=int(os.environ.get("SESSION_STORE_MAX_ENTRIES", "10000")),
+        )
+    raise ValueError(f"Unknown SESSION_STORE_BACKEND '{backend}', expected gcs, sqlite or memory.")
@@ -0,0 +1,44 @@
+# Process wide Google Cloud Storage client with pooled keep-alive connections
+
+import os
+import threading
+from google.cloud import storage
+from requests.adapters import HTTPAdapter
+
+
+GCS_POOL_SIZE = int(os.environ.get("GCS_POOL_SIZE", "32"))
+
+_lock = threading.Lock()
+_client = None
+_buckets = {}
+
+
+def get_storage_client() -> storage.Client:
+    """
+    Return the shared storage client, created on first use. Credentials are
+    resolved once and its HTTP session keeps up to GCS_POOL_SIZE connections
+    alive for reuse across requests and threads.
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                client = storage.Client()
+                adapter = HTTPAdapter(pool_connections=GCS_POOL_SIZE, pool_maxsize=GCS_POOL_SIZE)
+                client._http.mount("https://", adapter)
+                # STORAGE_EMULATOR_HOST is usually plain http
+                client._http.mount("http://", adapter)
+                _client = client
+    return _client
+
+
+def get_bucket(bucket_name: str) -> storage.Bucket:
+    """
+    Return a cached bucket handle of the shared client (no API call is made).
+    """
+    bucket = _buckets.get(bucket_name)
+    if bucket is None:
+        client = get_storage_client()
+        with _lock:
+            bucket = _buckets.setdefault(bucket_name, client.bucket(bucket_name))
+    return bucket
@@ -0,0 +1,82 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Time and memory per worker of AgentEngineApp.clone's agent copy:
+copy.deepcopy against clone_agent, on an agent shaped like root_agent.
+
+    PYTHONPATH=. uv run python tests/benchmark/agent_clone_benchmark.py --clones 200
+"""
+
+import argparse
+import copy
+import time
+import tracemalloc
+from collections.abc import Callable
+
+from google.adk.agents import Agent, BaseAgent
+from google.adk.tools import VertexAiSearchTool
+
+from app.agent_engine_app import clone_agent
+from app.prompts import return_instructions_root
+
+
+def template_agent() -> Agent:
+    """Same structure as app.agent.root_agent, without cloud configuration."""
+    return Agent(
+        name="linebot_agent",
+        model="gemini-2.5-flash",
+        description="Agent which responsible for answer the question from employee",
+        instruction=return_instructions_root(),
+        tools=[
+            VertexAiSearchTool(
+                search_engine_id="projects/benchmark/locations/us/collections/"
+                "default_collection/engines/linebot-search-engine"
+            )
+        ],
+    )
+
+
+def measure(
+    label: str, template: BaseAgent, clone: Callable[[BaseAgent], BaseAgent], count: int
+) -> tuple[float, float]:
+    start = time.perf_counter()
+    for _ in range(count):
+        clone(template)
+    per_clone_us = (time.perf_counter() - start) / count * 1_000_000
+
+    # memory each live clone keeps, as every worker holds on to its copy
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    clones = [clone(template) for _ in range(count)]
+    per_clone_bytes = (tracemalloc.get_traced_memory()[0] - before) / count
+    tracemalloc.stop()
+    del clones
+
+    print(f"{label:<16} {per_clone_us:9.1f} us {per_clone_bytes / 1024:9.1f} KiB per clone")
+    return per_clone_us, per_clone_bytes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clones", type=int, default=200)
+    args = parser.parse_args()
+
+    template = template_agent()
+    before_us, before_bytes = measure("copy.deepcopy", template, copy.deepcopy, args.clones)
+    after_us, after_bytes = measure("clone_agent", template, clone_agent, args.clones)
+    print(f"time x{before_us / after_us:.1f}, memory x{before_bytes / after_bytes:.1f}")
+
+
+if __name__ == "__main__":
+    main()
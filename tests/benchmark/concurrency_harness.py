@@ -0,0 +1,136 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Throughput and latency of AgentEngineApp.stream_query for a NUM_WORKERS /
+WORKER_CONCURRENCY combination, against a stub model with configurable latency
+and CPU cost per call. Cloud logging and tracing are not set up.
+
+    PYTHONPATH=. uv run python tests/benchmark/concurrency_harness.py \\
+        --workers 2 --concurrency 4 --clients 16 --requests 200
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import threading
+import time
+from collections.abc import AsyncGenerator
+
+import vertexai
+from google.adk.agents import Agent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from vertexai.preview.reasoning_engines import AdkApp
+
+from app.agent_engine_app import AgentEngineApp
+
+
+class StubLlm(BaseLlm):
+    """Answers after ``latency`` seconds of waiting and ``cpu_ms`` of CPU work."""
+
+    latency: float = 1.0
+    cpu_ms: float = 5.0
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        await asyncio.sleep(self.latency)
+        deadline = time.process_time() + self.cpu_ms / 1000
+        while time.process_time() < deadline:
+            pass
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text="stub answer")])
+        )
+
+
+def run_worker(
+    worker: int, clients: int, requests: int, args: argparse.Namespace
+) -> list[float]:
+    """Serves ``requests`` queries from ``clients`` threads in one worker process."""
+    os.environ["WORKER_CONCURRENCY"] = str(args.concurrency)
+    vertexai.init(project="harness", location="us-central1")
+    app = AgentEngineApp(
+        agent=Agent(
+            name="harness_agent",
+            model=StubLlm(model="stub", latency=args.latency, cpu_ms=args.cpu_ms),
+            instruction="Answer the question.",
+        )
+    )
+    # the ADK runner only, the harness measures the agent and not the telemetry
+    AdkApp.set_up(app)
+
+    latencies: list[float] = []
+    lock = threading.Lock()
+    remaining = [requests]
+
+    def client(index: int) -> None:
+        user_id = f"worker-{worker}-client-{index}"
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            start = time.perf_counter()
+            for _ in app.stream_query(message="How many leave days do I have?", user_id=user_id):
+                pass
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=1, help="NUM_WORKERS")
+    parser.add_argument("--concurrency", type=int, default=4, help="WORKER_CONCURRENCY, 0 for no limit")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent callers in total")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=1.0, help="Stub model latency (seconds)")
+    parser.add_argument("--cpu-ms", type=float, default=5.0, help="Stub model CPU time per call")
+    args = parser.parse_args()
+
+    jobs = [
+        (
+            worker,
+            max(1, args.clients // args.workers),
+            args.requests // args.workers,
+            args,
+        )
+        for worker in range(args.workers)
+    ]
+    start = time.perf_counter()
+    with multiprocessing.get_context("fork").Pool(args.workers) as pool:
+        results = pool.starmap(run_worker, jobs)
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for result in results for latency in result)
+    print(
+        f"workers={args.workers} concurrency={args.concurrency} clients={args.clients}: "
+        f"{len(latencies) / elapsed:.1f} queries/s, "
+        f"p50 {statistics.median(latencies) * 1000:.0f} ms, "
+        f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
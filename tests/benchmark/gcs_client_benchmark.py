@@ -0,0 +1,240 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Compares creating a storage.Client per call with the pooled client from
+app.utils.gcs, against an in-process fake GCS server (no cloud access needed).
+
+The first run uses STORAGE_EMULATOR_HOST, where clients are anonymous. The
+second resolves service-account credentials like a deployed client does: the
+key file is read and a signed token request goes to the fake server's token
+endpoint, once per client.
+
+    PYTHONPATH=. uv run python tests/benchmark/gcs_client_benchmark.py --iterations 200
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import ClassVar
+from urllib.parse import parse_qs, unquote, urlparse
+
+BUCKET = "benchmark-bucket"
+
+
+class FakeGcsHandler(BaseHTTPRequestHandler):
+    """Minimal subset of the GCS JSON API used by upload_from_string/download_as_text."""
+
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately; without TCP_NODELAY, Nagle plus the
+    # client's delayed ACK stalls every response on a reused keep-alive connection
+    disable_nagle_algorithm = True
+    objects: ClassVar[dict[str, tuple[bytes, int]]] = {}
+    lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+    def _send(self, status: int, body: bytes, headers: dict[str, str] | None = None) -> None:
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _resource(self, name: str, generation: int, size: int) -> bytes:
+        return json.dumps(
+            {
+                "bucket": BUCKET,
+                "name": name,
+                "generation": str(generation),
+                "metageneration": "1",
+                "size": str(size),
+            }
+        ).encode()
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if url.path == "/token":
+            self._send(
+                200,
+                b'{"access_token": "fake", "expires_in": 3600, "token_type": "Bearer"}',
+                {"Content-Type": "application/json"},
+            )
+            return
+        query = parse_qs(url.query)
+        if query.get("uploadType") != ["multipart"]:
+            self._send(400, b"only multipart uploads are supported")
+            return
+        boundary = self.headers["Content-Type"].split("boundary=")[1].strip("'\"")
+        parts = body.split(b"--" + boundary.encode())
+        metadata = json.loads(parts[1].split(b"\r\n\r\n", 1)[1].strip())
+        content = parts[2].split(b"\r\n\r\n", 1)[1][: -len(b"\r\n")]
+        name = metadata["name"]
+        with self.lock:
+            generation = self.objects.get(name, (b"", 0))[1] + 1
+            self.objects[name] = (content, generation)
+        self._send(
+            200,
+            self._resource(name, generation, len(content)),
+            {"Content-Type": "application/json"},
+        )
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        name = unquote(url.path.split("/o/", 1)[1])
+        with self.lock:
+            stored = self.objects.get(name)
+        if stored is None:
+            self._send(404, b'{"error": {"code": 404, "message": "Not Found"}}')
+            return
+        content, generation = stored
+        if "alt=media" in url.query:
+            self._send(
+                200,
+                content,
+                {
+                    "Content-Type": "application/json",
+                    "x-goog-generation": str(generation),
+                    "x-goog-metageneration": "1",
+                },
+            )
+        else:
+            self._send(
+                200,
+                self._resource(name, generation, len(content)),
+                {"Content-Type": "application/json"},
+            )
+
+
+def run(label: str, iterations: int, operation: Callable[[int], None]) -> None:
+    timings = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        operation(i)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    print(
+        f"{label:<28} mean {statistics.mean(timings):7.3f} ms   "
+        f"p50 {timings[len(timings) // 2]:7.3f} ms   "
+        f"p95 {timings[int(len(timings) * 0.95)]:7.3f} ms"
+    )
+
+
+def write_service_account_key(directory: str, token_uri: str) -> str:
+    """Writes a service-account key file with a fresh RSA key and a fake token URI."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    path = os.path.join(directory, "key.json")
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "type": "service_account",
+                "project_id": "benchmark",
+                "private_key_id": "benchmark",
+                "private_key": pem,
+                "client_email": "benchmark@benchmark.iam.gserviceaccount.com",
+                "client_id": "1",
+                "token_uri": token_uri,
+            },
+            f,
+        )
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGcsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["STORAGE_EMULATOR_HOST"] = f"http://127.0.0.1:{server.server_port}"
+
+    # imported after the emulator host is set so every client talks to the fake
+    import google.auth
+    import google.auth.transport.requests
+    import google.cloud.storage as storage
+
+    from app.utils.gcs import get_bucket
+
+    payload = json.dumps({"user_id": "benchmark", "session_count": 1})
+
+    def per_call_client(i: int) -> None:
+        blob = storage.Client().bucket(BUCKET).blob(f"sessions/{i % 10}.json")
+        blob.upload_from_string(payload, content_type="application/json")
+        storage.Client().bucket(BUCKET).blob(f"sessions/{i % 10}.json").download_as_text()
+
+    def pooled_client(i: int) -> None:
+        blob = get_bucket(BUCKET).blob(f"sessions/{i % 10}.json")
+        blob.upload_from_string(payload, content_type="application/json")
+        get_bucket(BUCKET).blob(f"sessions/{i % 10}.json").download_as_text()
+
+    print(f"upload + download, {args.iterations} iterations against {server.server_address}")
+    run("per-call storage.Client()", args.iterations, per_call_client)
+    run("pooled client", args.iterations, pooled_client)
+
+    # with credentials: the endpoint override keeps the client authenticated
+    host = os.environ.pop("STORAGE_EMULATOR_HOST")
+    os.environ["API_ENDPOINT_OVERRIDE"] = host
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = write_service_account_key(
+            directory, f"{host}/token"
+        )
+
+        def resolve_credentials(i: int) -> None:
+            credentials, _ = google.auth.default(
+                scopes=["https://www.googleapis.com/auth/devstorage.read_write"]
+            )
+            credentials.refresh(google.auth.transport.requests.Request())
+
+        def per_call_authenticated(i: int) -> None:
+            client = storage.Client(project="benchmark")
+            client.bucket(BUCKET).blob(f"sessions/{i % 10}.json").upload_from_string(
+                payload, content_type="application/json"
+            )
+            storage.Client(project="benchmark").bucket(BUCKET).blob(
+                f"sessions/{i % 10}.json"
+            ).download_as_text()
+
+        def pooled_authenticated(i: int) -> None:
+            blob = get_bucket(BUCKET, project="benchmark").blob(f"sessions/{i % 10}.json")
+            blob.upload_from_string(payload, content_type="application/json")
+            get_bucket(BUCKET, project="benchmark").blob(
+                f"sessions/{i % 10}.json"
+            ).download_as_text()
+
+        print("with service-account credentials")
+        run("credential resolution", args.iterations, resolve_credentials)
+        run("per-call storage.Client()", args.iterations, per_call_authenticated)
+        run("pooled client", args.iterations, pooled_authenticated)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Prompt tokens and model latency per turn of one long conversation, with and
+without HistoryCompactor. The stub model counts a token per 4 bytes of the
+prompt and takes a fixed latency plus a per-prompt-token cost.
+
+    PYTHONPATH=. uv run python tests/benchmark/history_compaction_benchmark.py \\
+        --turns 30 --budget 2000
+"""
+
+import argparse
+import asyncio
+import time
+from collections.abc import AsyncGenerator
+
+from google.adk.agents import Agent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from app.utils.history import HistoryCompactor, content_bytes
+
+
+class StubLlm(BaseLlm):
+    """Answers with ``answer_bytes`` of text after a prompt-size dependent delay."""
+
+    base_ms: float = 300
+    ms_per_1k_tokens: float = 50
+    answer_bytes: int = 1200
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        prompt_tokens = sum(content_bytes(c) for c in llm_request.contents) // 4
+        await asyncio.sleep(
+            (self.base_ms + self.ms_per_1k_tokens * prompt_tokens / 1000) / 1000
+        )
+        yield LlmResponse(
+            content=types.Content(
+                role="model", parts=[types.Part(text="x" * self.answer_bytes)]
+            ),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens, candidates_token_count=self.answer_bytes // 4
+            ),
+        )
+
+
+async def conversation(turns: int, budget: int | None) -> list[tuple[int, float]]:
+    """(prompt tokens, latency ms) of each turn."""
+    measured: list[tuple[int, float]] = []
+    model = StubLlm(model="stub")
+    callbacks = {}
+    if budget:
+        compactor = HistoryCompactor(token_budget=budget)
+        callbacks = {
+            "before_model_callback": compactor.before_model,
+            "after_model_callback": compactor.after_model,
+        }
+    agent = Agent(name="benchmark", model=model, instruction="Answer.", **callbacks)
+    runner = InMemoryRunner(agent=agent, app_name="benchmark")
+    session = await runner.session_service.create_session(
+        app_name="benchmark", user_id="user"
+    )
+    for turn in range(turns):
+        start = time.perf_counter()
+        async for event in runner.run_async(
+            user_id="user",
+            session_id=session.id,
+            new_message=types.Content(
+                role="user", parts=[types.Part(text=f"Question number {turn} about leave?")]
+            ),
+        ):
+            if event.usage_metadata:
+                tokens = event.usage_metadata.prompt_token_count or 0
+        measured.append((tokens, (time.perf_counter() - start) * 1000))
+    return measured
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--budget", type=int, default=2000, help="HISTORY_TOKEN_BUDGET")
+    args = parser.parse_args()
+
+    full = asyncio.run(conversation(args.turns, None))
+    compacted = asyncio.run(conversation(args.turns, args.budget))
+    print(f"{'turn':>4} {'full tokens':>12} {'full ms':>8} {'compacted tokens':>17} {'compacted ms':>13}")
+    for turn, ((full_tokens, full_ms), (tokens, ms)) in enumerate(zip(full, compacted, strict=True)):
+        print(f"{turn + 1:>4} {full_tokens:>12} {full_ms:>8.0f} {tokens:>17} {ms:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
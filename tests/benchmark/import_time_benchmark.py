@@ -0,0 +1,80 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Cold import time of app modules, from `python -X importtime` in a fresh
+interpreter, with the slowest imports each pulls in. With --max-ms the script
+exits non-zero when the first module exceeds the budget, for use in CI.
+
+    PYTHONPATH=. uv run python tests/benchmark/import_time_benchmark.py --max-ms 200
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_times(module: str) -> list[tuple[str, int, int]]:
+    """(name, cumulative us, nesting depth) of every module imported by ``module``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            _, cumulative, indent, name = match.groups()
+            times.append((name, int(cumulative), (len(indent) - 1) // 2))
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "modules", nargs="*", default=["app.agent", "app.agent_engine_app"]
+    )
+    parser.add_argument("--top", type=int, default=5, help="Slowest imports to list")
+    parser.add_argument(
+        "--max-ms", type=float, help="Fail when the first module takes longer"
+    )
+    args = parser.parse_args()
+
+    totals = {}
+    for module in args.modules:
+        times = import_times(module)
+        # a module is listed after everything it imports, interpreter startup
+        # imports come before it at the same depth
+        end = next(i for i, (name, _, depth) in enumerate(times) if name == module and depth == 0)
+        start = max((i for i in range(end) if times[i][2] == 0), default=-1) + 1
+        total_ms = times[end][1] / 1000
+        totals[module] = total_ms
+        print(f"{module:<24} {total_ms:9.1f} ms")
+        # direct dependencies only, nested ones are part of their cumulative time
+        direct = [entry for entry in times[start:end] if entry[2] == 1]
+        for name, us, _ in sorted(direct, key=lambda entry: -entry[1])[: args.top]:
+            print(f"    {name:<36} {us / 1000:9.1f} ms")
+
+    first = args.modules[0]
+    if args.max_ms is not None and totals[first] > args.max_ms:
+        print(f"{first} import took {totals[first]:.1f} ms, budget is {args.max_ms} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Latency of the webhook's SessionStore backends for the per-message pattern
+(get + incr). The GCS backend runs against the in-process fake GCS server.
+
+    PYTHONPATH=. uv run python tests/benchmark/session_store_benchmark.py --backends memory sqlite gcs
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+from gcs_client_benchmark import BUCKET, FakeGcsHandler
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(__file__),
+        "..",
+        "..",
+        "deployment",
+        "terraform",
+        "cloud_run_function_chat",
+    ),
+)
+
+
+async def measure(backend: str, iterations: int, users: int) -> None:
+    from session_store import create_session_store
+
+    store = create_session_store(backend)
+    timings = []
+    for i in range(iterations):
+        user_id = f"user-{i % users}"
+        start = time.perf_counter()
+        await store.get(user_id)
+        await store.incr(user_id)
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    flush_start = time.perf_counter()
+    store.close()
+    flush_ms = (time.perf_counter() - flush_start) * 1000
+    timings.sort()
+    print(
+        f"{backend:<8} mean {statistics.mean(timings):9.1f} us   "
+        f"p50 {timings[len(timings) // 2]:9.1f} us   "
+        f"p99 {timings[int(len(timings) * 0.99)]:9.1f} us   "
+        f"close/flush {flush_ms:7.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--backends", nargs="+", default=["memory", "sqlite", "gcs"]
+    )
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=100)
+    args = parser.parse_args()
+
+    if "gcs" in args.backends:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGcsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        os.environ["STORAGE_EMULATOR_HOST"] = f"http://127.0.0.1:{server.server_port}"
+        os.environ["SESSION_STORE_GCS_BUCKET"] = BUCKET
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SESSION_STORE_SQLITE_PATH"] = os.path.join(tmp, "sessions.db")
+        print(f"get + incr, {args.iterations} iterations over {args.users} users")
+        for backend in args.backends:
+            asyncio.run(measure(backend, args.iterations, args.users))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Per-span CPU cost of turning a ReadableSpan into the exporter's span dict:
+json.loads(span.to_json()) plus a json.dumps size check, against span_to_dict
+plus json_size.
+
+    PYTHONPATH=. uv run python tests/benchmark/span_export_benchmark.py --spans 5000
+"""
+
+import argparse
+import json
+import time
+from collections.abc import Callable, Sequence
+
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+
+from app.utils.tracing import json_size, span_to_dict
+
+
+def synthetic_spans(count: int, payload_size: int) -> Sequence[ReadableSpan]:
+    """Spans shaped like ADK's call_llm spans: a few ids plus a large request/response."""
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracer = provider.get_tracer("benchmark")
+    request = json.dumps({"contents": ["x" * 64] * (payload_size // 70)})
+    for i in range(count):
+        with tracer.start_as_current_span(
+            "call_llm",
+            attributes={
+                "gen_ai.system": "gcp.vertex.agent",
+                "gen_ai.request.model": "gemini-2.5-flash",
+                "gcp.vertex.agent.invocation_id": f"e-{i}",
+                "gcp.vertex.agent.session_id": f"session-{i % 50}",
+                "gcp.vertex.agent.llm_request": request,
+                "gcp.vertex.agent.llm_response": request[: payload_size // 4],
+                "gen_ai.usage.input_tokens": 1234,
+            },
+        ) as span:
+            span.add_event("response", {"chunks": (1, 2, 3)})
+    return exporter.get_finished_spans()
+
+
+def reparse(span: ReadableSpan) -> int:
+    span_dict = json.loads(span.to_json())
+    return len(json.dumps(span_dict["attributes"]).encode())
+
+
+def direct(span: ReadableSpan) -> int:
+    return json_size(span_to_dict(span)["attributes"])
+
+
+def measure(label: str, spans: Sequence[ReadableSpan], convert: Callable) -> float:
+    start = time.process_time()
+    for span in spans:
+        convert(span)
+    per_span_us = (time.process_time() - start) / len(spans) * 1_000_000
+    print(f"{label:<36} {per_span_us:9.1f} us CPU per span")
+    return per_span_us
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--spans", type=int, default=5000)
+    parser.add_argument("--payload-size", type=int, default=8 * 1024)
+    args = parser.parse_args()
+
+    spans = synthetic_spans(args.spans, args.payload_size)
+    print(f"{len(spans)} spans, ~{args.payload_size} byte LLM payload attributes")
+    before = measure("json.loads(to_json()) + json.dumps", spans, reparse)
+    after = measure("span_to_dict + json_size", spans, direct)
+    print(f"speedup x{before / after:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Load time and per-query latency of the local vector index (VectorIndex) for
+synthetic corpora of the given sizes, with the matrix memory-mapped from disk.
+
+    PYTHONPATH=. uv run python tests/benchmark/vector_search_benchmark.py \\
+        --chunks 10000 1000000 --dim 256
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from app.utils.vector_index import (
+    CHUNKS_FILE,
+    CONFIG_FILE,
+    EMBEDDINGS_FILE,
+    IDF_FILE,
+    OFFSETS_FILE,
+    VectorIndex,
+)
+
+WORDS = "leave policy return order track support salary holiday office travel".split()
+
+
+def write_synthetic_index(directory: str, chunks: int, dim: int) -> None:
+    """Random unit vectors written in build_index's layout, in slices to bound memory."""
+    rng = np.random.default_rng(0)
+    embeddings = np.lib.format.open_memmap(
+        os.path.join(directory, EMBEDDINGS_FILE),
+        mode="w+",
+        dtype=np.float32,
+        shape=(chunks, dim),
+    )
+    for start in range(0, chunks, 100_000):
+        block = rng.standard_normal((min(100_000, chunks - start), dim), dtype=np.float32)
+        embeddings[start : start + len(block)] = block / np.linalg.norm(
+            block, axis=1, keepdims=True
+        )
+    embeddings.flush()
+    np.save(os.path.join(directory, IDF_FILE), np.ones(dim, dtype=np.float32))
+    offsets = [0]
+    with open(os.path.join(directory, CHUNKS_FILE), "wb") as f:
+        for i in range(chunks):
+            offsets.append(offsets[-1] + f.write(f'{{"text": "chunk {i}"}}\n'.encode()))
+    np.save(os.path.join(directory, OFFSETS_FILE), np.array(offsets, dtype=np.int64))
+    with open(os.path.join(directory, CONFIG_FILE), "w") as f:
+        f.write(f'{{"embedder": "hashing", "dim": {dim}, "chunks": {chunks}}}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    queries = [" ".join(rng.choice(WORDS, 4)) for _ in range(args.queries)]
+    for chunks in args.chunks:
+        with tempfile.TemporaryDirectory() as directory:
+            write_synthetic_index(directory, chunks, args.dim)
+            start = time.perf_counter()
+            index = VectorIndex.load(directory)
+            load_ms = (time.perf_counter() - start) * 1000
+            index.search(queries[0])  # fault the matrix into the page cache
+            latencies = []
+            for query in queries:
+                start = time.perf_counter()
+                index.search(query, k=3)
+                latencies.append((time.perf_counter() - start) * 1000)
+            print(
+                f"{chunks:>9} chunks x {args.dim} dims: load {load_ms:8.1f} ms, "
+                f"query p50 {statistics.median(latencies):7.2f} ms, "
+                f"max {max(latencies):7.2f} ms"
+            )
+            del index
+
+
+if __name__ == "__main__":
+    main()
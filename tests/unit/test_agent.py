@@ -0,0 +1,61 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import subprocess
+import sys
+
+import pytest
+from google.adk.tools import VertexAiSearchTool
+
+from app.agent import build_root_agent
+from app.utils.models import VertexAiGemini
+
+
+def test_importing_agent_has_no_cloud_side_effects() -> None:
+    """Importing app.agent loads neither ADK, Vertex AI nor google.auth."""
+    code = (
+        "import sys, app.agent; "
+        "print([m for m in ('google.adk', 'vertexai', 'google.auth') if m in sys.modules])"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_build_root_agent_uses_explicit_configuration(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """The given project and location win over the environment, which is untouched."""
+    for name in ("GOOGLE_CLOUD_PROJECT", "GOOGLE_CLOUD_LOCATION"):
+        monkeypatch.setenv(name, "from-env")
+    monkeypatch.delenv("GOOGLE_GENAI_USE_VERTEXAI", raising=False)
+    agent = build_root_agent(
+        project_id="my-project",
+        location="asia-southeast1",
+        search_engine_id="projects/p/engines/e",
+    )
+
+    assert agent.name == "linebot_agent"
+    tool = agent.tools[0]
+    assert isinstance(tool, VertexAiSearchTool)
+    assert tool.search_engine_id == "projects/p/engines/e"
+    assert isinstance(agent.model, VertexAiGemini)
+    client = agent.model.api_client
+    assert client.vertexai
+    assert client._api_client.project == "my-project"
+    assert client._api_client.location == "asia-southeast1"
+    assert os.environ["GOOGLE_CLOUD_PROJECT"] == "from-env"
+    assert "GOOGLE_GENAI_USE_VERTEXAI" not in os.environ
@@ -0,0 +1,49 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from google.adk.agents import Agent
+from google.adk.tools import VertexAiSearchTool
+
+from app.agent_engine_app import clone_agent
+
+
+def test_clone_shares_configuration_but_not_containers() -> None:
+    """The clone reuses tools and instructions but owns its agents and lists."""
+    tool = VertexAiSearchTool(
+        search_engine_id="projects/p/locations/us/collections/c/engines/e"
+    )
+    child = Agent(name="child", model="gemini-2.5-flash", tools=[tool])
+    template = Agent(
+        name="root",
+        model="gemini-2.5-flash",
+        instruction="x" * 10_000,
+        tools=[tool],
+        sub_agents=[child],
+    )
+
+    clone = clone_agent(template)
+    assert isinstance(clone, Agent)
+
+    assert clone is not template
+    assert clone.instruction is template.instruction
+    assert clone.tools[0] is tool
+    assert clone.tools is not template.tools
+    cloned_child = clone.sub_agents[0]
+    assert isinstance(cloned_child, Agent)
+    assert cloned_child is not child
+    assert cloned_child.tools[0] is tool
+    assert cloned_child.parent_agent is clone
+    assert child.parent_agent is template
+    clone.tools.append(tool)
+    assert len(template.tools) == 1
@@ -0,0 +1,94 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.utils.feedback import (
+    FeedbackAggregator,
+    FeedbackBuffer,
+    FeedbackBufferFullError,
+)
+from app.utils.typing import Feedback
+
+
+def test_feedback_is_written_in_batches() -> None:
+    """Buffered entries reach Cloud Logging as batches of at most batch_size."""
+    logger = MagicMock()
+    buffer = FeedbackBuffer(logger, batch_size=10, flush_interval=0.05)
+
+    for i in range(25):
+        buffer.add({"score": i, "invocation_id": f"e-{i}"})
+    assert buffer.flush(timeout=5)
+
+    batch = logger.batch.return_value
+    assert batch.log_struct.call_count == 25
+    assert 3 <= batch.commit.call_count <= 25
+    logger.log_struct.assert_not_called()
+    buffer.close()
+
+
+def test_full_buffer_raises_after_timeout() -> None:
+    """When the writer cannot keep up, add blocks briefly and then rejects."""
+    release = threading.Event()
+    logger = MagicMock()
+    logger.batch.return_value.commit.side_effect = lambda: release.wait()
+    buffer = FeedbackBuffer(
+        logger, max_size=2, batch_size=1, flush_interval=0, put_timeout=0.05
+    )
+
+    # the first entry is taken by the stalled writer, two more fill the queue
+    buffer.add({"score": 1})
+    for _ in range(2):
+        buffer.add({"score": 2})
+    with pytest.raises(FeedbackBufferFullError):
+        for _ in range(3):
+            buffer.add({"score": 3})
+
+    release.set()
+    assert buffer.flush(timeout=5)
+    buffer.close()
+
+
+def test_aggregator_rolls_window_and_breaks_down_by_key() -> None:
+    """Window stats forget old minutes while all-time and per-key stats keep them."""
+    aggregator = FeedbackAggregator(window_minutes=5, invocation_prefix_length=4)
+    start = 1_000_000 * 60.0
+    aggregator.add(
+        Feedback(score=1, invocation_id="exp1-a", user_id="alice"), now=start
+    )
+    aggregator.add(
+        Feedback(score=5, invocation_id="exp1-b", user_id="bob"), now=start + 60
+    )
+    aggregator.add(
+        Feedback(score=4, invocation_id="exp2-c", user_id="alice"), now=start + 300
+    )
+
+    summary = aggregator.summary(
+        user_id="alice", invocation_prefix="exp1", now=start + 300
+    )
+    assert summary["since"] == aggregator.started_at
+    assert summary["all_time"]["count"] == 3
+    window = summary["last_5_minutes"]
+    assert window["count"] == 2
+    assert window["mean"] == 4.5
+    assert window["histogram"]["4-5"] == 1
+    assert window["histogram"][">=5"] == 1
+    assert summary["user"]["count"] == 2
+    assert summary["user"]["mean"] == 2.5
+    assert summary["invocation_prefix"]["count"] == 2
+
+    assert aggregator.summary(now=start + 3600)["last_5_minutes"]["count"] == 0
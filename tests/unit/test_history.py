@@ -0,0 +1,96 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pickle
+from unittest.mock import MagicMock
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from app.utils.history import HistoryCompactor
+
+
+def _conversation(turns: int) -> list[types.Content]:
+    contents = []
+    for i in range(turns):
+        contents.append(types.Content(role="user", parts=[types.Part(text=f"question {i}")]))
+        contents.append(types.Content(role="model", parts=[types.Part(text="a" * 400)]))
+    contents.append(types.Content(role="user", parts=[types.Part(text="current question")]))
+    return contents
+
+
+def test_oldest_turns_are_dropped_to_fit_the_budget() -> None:
+    """The prompt keeps the newest turns that fit and notes the dropped questions."""
+    compactor = HistoryCompactor(token_budget=250, bytes_per_token=4.0)
+    request = LlmRequest(contents=_conversation(5))
+
+    compactor.before_model(MagicMock(invocation_id="e-1"), request)
+
+    texts = [
+        part.text or "" for content in request.contents for part in content.parts or []
+    ]
+    assert texts[-1] == "current question"
+    assert len(request.contents) == 5
+    assert texts[0].startswith("Earlier in this conversation the user asked: ")
+    assert "question 0" in texts[0] and "question 2" in texts[0]
+    assert texts[1] == "question 3"
+
+
+def test_short_history_is_sent_unchanged_and_calls_are_measured() -> None:
+    """Within the budget nothing is dropped; after_model records prompt tokens."""
+    compactor = HistoryCompactor(token_budget=10_000)
+    contents = _conversation(2)
+    request = LlmRequest(contents=contents)
+    context = MagicMock(invocation_id="e-2")
+
+    compactor.before_model(context, request)
+    compactor.after_model(
+        context,
+        LlmResponse(
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=250, candidates_token_count=20
+            )
+        ),
+    )
+
+    assert request.contents == contents
+    stats = compactor.stats()
+    assert stats["calls"] == 1
+    assert stats["mean_prompt_tokens"] == 250
+    assert stats["compacted_calls"] == 0
+
+
+def test_failed_calls_do_not_grow_pending_without_bound() -> None:
+    """Calls whose after_model never runs are dropped oldest first."""
+    compactor = HistoryCompactor(token_budget=10_000)
+    for i in range(HistoryCompactor.MAX_PENDING + 10):
+        compactor.before_model(
+            MagicMock(invocation_id=f"e-{i}"), LlmRequest(contents=_conversation(1))
+        )
+
+    assert len(compactor._pending) == HistoryCompactor.MAX_PENDING
+    assert "e-0" not in compactor._pending
+
+
+def test_compactor_can_be_pickled() -> None:
+    """Deployment pickles the agent with its callbacks, the lock is recreated."""
+    compactor = HistoryCompactor(token_budget=250)
+    compactor.before_model(MagicMock(invocation_id="e-3"), LlmRequest(contents=_conversation(1)))
+
+    copy = pickle.loads(pickle.dumps(compactor))
+
+    assert copy.token_budget == 250
+    assert copy._pending == {}
+    copy.before_model(MagicMock(invocation_id="e-4"), LlmRequest(contents=_conversation(1)))
@@ -0,0 +1,70 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.agent_engine_app import acquire_slot
+
+
+def test_cancelled_wait_does_not_leak_the_slot() -> None:
+    """A query cancelled while waiting gives back the slot its thread acquires later."""
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    async def main() -> None:
+        waiter = asyncio.ensure_future(acquire_slot(slots, executor))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        assert waiter.cancelled()
+        # the running query finishes, the cancelled waiter's thread takes the slot
+        slots.release()
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if slots.acquire(blocking=False):
+                return
+        raise AssertionError("slot leaked")
+
+    asyncio.run(main())
+
+
+def test_slot_is_acquired_when_free() -> None:
+    """Without contention the slot is taken right away."""
+    slots = threading.BoundedSemaphore(2)
+    asyncio.run(acquire_slot(slots, ThreadPoolExecutor(max_workers=1)))
+    assert slots.acquire(blocking=False)
+    assert not slots.acquire(blocking=False)
+
+
+def test_waiting_queries_do_not_starve_the_slot_holder() -> None:
+    """Waiters do not use the default executor the running query needs to finish."""
+    slots = threading.BoundedSemaphore(1)
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    async def query() -> None:
+        await acquire_slot(slots, executor)
+        try:
+            await asyncio.to_thread(time.sleep, 0.01)
+        finally:
+            slots.release()
+
+    async def main() -> None:
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=2))
+        await asyncio.wait_for(asyncio.gather(*(query() for _ in range(4))), timeout=5)
+
+    asyncio.run(main())
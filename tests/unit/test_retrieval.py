@@ -0,0 +1,101 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import inspect
+import time
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from google.cloud import discoveryengine_v1 as discoveryengine
+
+from app.utils.retrieval import RetrievalCache, VertexAiSearchRetriever
+
+ENGINE = "projects/p/locations/us/collections/default_collection/engines/e"
+
+
+def _search_result(title: str) -> discoveryengine.SearchResponse.SearchResult:
+    document = discoveryengine.Document(
+        derived_struct_data={
+            "title": title,
+            "link": f"gs://docs/{title}.pdf",
+            "snippets": [{"snippet": f"about {title}"}],
+        }
+    )
+    return discoveryengine.SearchResponse.SearchResult(id=title, document=document)
+
+
+def test_repeated_queries_are_served_from_the_cache() -> None:
+    """Rephrasings differing in case, spacing and punctuation skip the API call."""
+    client = MagicMock()
+    client.search.return_value = iter([_search_result("leave-policy")])
+    retriever = VertexAiSearchRetriever(ENGINE, cache=RetrievalCache(), client=client)
+
+    first = retriever.search("How many leave days?")
+    second = retriever.search("  how many LEAVE days ")
+
+    assert client.search.call_count == 1
+    assert first == second
+    assert first[0]["title"] == "leave-policy"
+    assert first[0]["snippets"] == ["about leave-policy"]
+    assert retriever.cache is not None
+    assert retriever.cache.stats()["hits"] == 1
+
+
+def test_search_tool_does_not_block_the_event_loop() -> None:
+    """The tool is a coroutine function, slow searches of concurrent calls overlap."""
+
+    def slow_search(request: discoveryengine.SearchRequest) -> list:
+        time.sleep(0.2)
+        return [_search_result(request.query)]
+
+    client = MagicMock()
+    client.search.side_effect = slow_search
+    tool = VertexAiSearchRetriever(ENGINE, client=client).as_tool()
+    assert inspect.iscoroutinefunction(tool)
+
+    async def main() -> list:
+        return await asyncio.gather(tool("leave"), tool("pay"), tool("office"))
+
+    start = time.perf_counter()
+    results = asyncio.run(main())
+
+    assert time.perf_counter() - start < 0.5
+    assert [r["results"][0]["title"] for r in results] == ["leave", "pay", "office"]
+
+
+def test_cache_evicts_least_recently_used_over_the_memory_cap() -> None:
+    """Entries beyond max_bytes are evicted oldest first, reads refresh an entry."""
+    cache = RetrievalCache(max_bytes=250)
+    results = [{"title": "x" * 50}]
+    cache.put(ENGINE, "a", results)
+    cache.put(ENGINE, "b", results)
+    cache.get(ENGINE, "a")
+    cache.put(ENGINE, "c", results)
+    cache.put(ENGINE, "d", results)
+
+    assert cache.get(ENGINE, "a") == results
+    assert cache.get(ENGINE, "b") is None
+    assert cache.get(ENGINE, "other engine") is None
+
+
+def test_cache_persists_to_disk_and_expires(tmp_path: Path) -> None:
+    """A new cache on the same file sees earlier results until they expire."""
+    path = str(tmp_path / "search.db")
+    RetrievalCache(path=path).put(ENGINE, "leave policy", [{"title": "leave"}])
+    RetrievalCache(ttl_seconds=-1, path=path).put(ENGINE, "old", [{"title": "old"}])
+
+    restarted = RetrievalCache(path=path)
+    assert restarted.get(ENGINE, "Leave policy?") == [{"title": "leave"}]
+    assert restarted.get(ENGINE, "old") is None
@@ -0,0 +1,59 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from opentelemetry.trace import Status, StatusCode
+
+from app.utils.sampling import TailSamplingSpanProcessor
+
+
+def _provider(**kwargs: Any) -> tuple[TracerProvider, InMemorySpanExporter, TailSamplingSpanProcessor]:
+    exporter = InMemorySpanExporter()
+    processor = TailSamplingSpanProcessor(SimpleSpanProcessor(exporter), **kwargs)
+    provider = TracerProvider()
+    provider.add_span_processor(processor)
+    return provider, exporter, processor
+
+
+def test_error_traces_are_kept_and_normal_traces_dropped() -> None:
+    """With a zero sample rate only the trace containing an error is exported."""
+    provider, exporter, processor = _provider(sample_rate=0.0)
+    tracer = provider.get_tracer("test")
+
+    with tracer.start_as_current_span("ok-root"):
+        with tracer.start_as_current_span("ok-child"):
+            pass
+    with tracer.start_as_current_span("error-root"):
+        with tracer.start_as_current_span("error-child") as child:
+            child.set_status(Status(StatusCode.ERROR))
+
+    names = sorted(span.name for span in exporter.get_finished_spans())
+    assert names == ["error-child", "error-root"]
+    assert processor.stats() == {"kept_traces": 1, "dropped_traces": 1, "pending_traces": 0}
+
+
+def test_slow_traces_are_kept() -> None:
+    """A root span at or above the latency threshold keeps its trace."""
+    provider, exporter, processor = _provider(sample_rate=0.0, latency_threshold_ms=0)
+    with provider.get_tracer("test").start_as_current_span("root"):
+        pass
+
+    assert [span.name for span in exporter.get_finished_spans()] == ["root"]
+    assert processor.kept_traces == 1
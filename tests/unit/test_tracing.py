@@ -0,0 +1,133 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+import json
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import SpanExportResult
+from opentelemetry.trace import Link, Status, StatusCode
+
+from app.utils.tracing import (
+    CloudTraceLoggingSpanExporter,
+    LocalFileSpanExporter,
+    json_size,
+    span_to_dict,
+)
+
+
+def test_span_to_dict_matches_to_json() -> None:
+    """span_to_dict must produce exactly what the SDK's JSON round trip produced."""
+    tracer = TracerProvider().get_tracer("test")
+    with tracer.start_as_current_span(
+        "root",
+        attributes={"text": "hello", "count": 3, "ratio": 1.5, "flag": True, "tags": ("a", "b")},
+    ) as root:
+        with tracer.start_as_current_span(
+            "child", links=[Link(root.get_span_context(), {"kind": "link"})]
+        ) as child:
+            child.add_event("event", {"values": [1, 2]})
+            child.set_status(Status(StatusCode.ERROR, "failed"))
+
+    for span in (root, child):
+        assert isinstance(span, ReadableSpan)
+        assert span_to_dict(span) == json.loads(span.to_json())
+
+
+def test_json_size_matches_serialized_size() -> None:
+    """json_size must agree with the UTF-8 length of json.dumps."""
+    value = {
+        "text": "hello",
+        "thai": "สวัสดี",
+        "number": 12,
+        "float": 0.25,
+        "flags": [True, False, None],
+        "nested": {"list": ["a", "b"], "empty": {}},
+    }
+    assert json_size(value) == len(json.dumps(value, ensure_ascii=False).encode())
+
+
+def test_export_batches_log_writes() -> None:
+    """Spans of one export are written in batches of at most max_batch_entries."""
+    logging_client = MagicMock()
+    exporter = CloudTraceLoggingSpanExporter(
+        project_id="test-project",
+        logging_client=logging_client,
+        storage_client=MagicMock(),
+        client=MagicMock(),
+        max_batch_entries=3,
+    )
+    tracer = TracerProvider().get_tracer("test")
+    spans: list[ReadableSpan] = []
+    for i in range(7):
+        with tracer.start_as_current_span(f"span-{i}") as span:
+            pass
+        assert isinstance(span, ReadableSpan)
+        spans.append(span)
+
+    assert exporter.export(spans) == SpanExportResult.SUCCESS
+    batch = logging_client.logger.return_value.batch
+    assert batch.call_count == 3
+    assert batch.return_value.log_struct.call_count == 7
+    assert batch.return_value.commit.call_count == 3
+
+
+def test_only_oversized_attributes_are_offloaded() -> None:
+    """The largest attributes move to GCS as gzip; the rest stay in the log entry."""
+    storage_client = MagicMock()
+    exporter = CloudTraceLoggingSpanExporter(
+        project_id="test-project",
+        logging_client=MagicMock(),
+        storage_client=storage_client,
+        client=MagicMock(),
+    )
+    span_dict = {
+        "attributes": {"small": "x", "large": "y" * 300_000, "medium": "z" * 100_000}
+    }
+
+    attributes = exporter._process_large_attributes(span_dict, "abc")["attributes"]
+    exporter.shutdown()
+
+    assert attributes["small"] == "x"
+    assert attributes["medium"] == "z" * 100_000
+    assert len(attributes["large"]) == exporter.PREVIEW_CHARS
+    assert attributes["large.uri_payload"].endswith("spans/abc/large.json.gz")
+    blob = storage_client.bucket.return_value.blob
+    blob.assert_called_once_with("spans/abc/large.json.gz")
+    assert blob.return_value.content_encoding == "gzip"
+
+
+def test_local_file_exporter_writes_compressed_jsonl(tmp_path: Path) -> None:
+    """The local exporter writes the same span dicts as gzip-compressed JSON lines."""
+    exporter = LocalFileSpanExporter(directory=str(tmp_path), project_id="test-project")
+    tracer = TracerProvider().get_tracer("test")
+    with tracer.start_as_current_span("local", attributes={"large": "x" * 300_000}) as span:
+        pass
+    assert isinstance(span, ReadableSpan)
+
+    assert exporter.export([span]) == SpanExportResult.SUCCESS
+    exporter.shutdown()
+
+    (span_file,) = tmp_path.glob("spans-*.jsonl.gz")
+    with gzip.open(span_file, "rt") as f:
+        (line,) = f.readlines()
+    span_dict = json.loads(line)
+    assert span_dict["name"] == "local"
+    assert span_dict["trace"].startswith("projects/test-project/traces/")
+    assert len(span_dict["attributes"]["large"]) == exporter.PREVIEW_CHARS
+    offloaded = span_dict["attributes"]["large.uri_payload"].removeprefix("file://")
+    with gzip.open(offloaded, "rt") as f:
+        assert json.load(f) == "x" * 300_000
@@ -0,0 +1,67 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from pathlib import Path
+
+import cloudpickle
+import numpy as np
+
+from app.agent import build_root_agent
+from app.utils.retrieval import RetrievalCache
+from app.utils.vector_index import HashingEmbedder, VectorIndex, build_index
+
+CHUNKS = [
+    {"text": "What is the return policy?\nReturns are accepted within 30 days."},
+    {"text": "How do I track my order?\nUse the Orders page of your account."},
+    {"text": "How many leave days do employees get?\nEmployees get 15 days a year."},
+]
+
+
+def test_built_index_is_memory_mapped_and_ranks_by_cosine(tmp_path: Path) -> None:
+    """The loaded matrix is a read-only memmap and the matching chunk ranks first."""
+    build_index(CHUNKS, str(tmp_path), HashingEmbedder(dim=256))
+    index = VectorIndex.load(str(tmp_path))
+
+    assert isinstance(index.embeddings, np.memmap)
+    matches = index.search("how many leave days do I get", k=2)
+    assert matches[0][1] == CHUNKS[2]
+    assert matches[0][0] > matches[1][0]
+
+
+def test_tool_signals_fallback_on_low_scores(tmp_path: Path) -> None:
+    """Unrelated questions set fallback so the agent uses the remote search."""
+    build_index(CHUNKS, str(tmp_path), HashingEmbedder(dim=256))
+    tool = VectorIndex.load(str(tmp_path)).as_tool(min_score=0.3)
+
+    assert tool("return policy")["fallback"] is False
+    result = tool("quarterly revenue forecast")
+    assert result["fallback"] is True
+    assert len(result["results"]) == 3
+
+
+def test_agent_with_local_index_and_search_cache_can_be_pickled(tmp_path: Path) -> None:
+    """Deployment pickles the agent; the index is mapped again from its directory."""
+    build_index(CHUNKS, str(tmp_path), HashingEmbedder(dim=256))
+    agent = build_root_agent(
+        project_id="my-project",
+        search_engine_id="projects/p/locations/us/collections/c/engines/e",
+        local_index=VectorIndex.load(str(tmp_path)),
+        local_min_score=0.3,
+        search_cache=RetrievalCache(),
+    )
+
+    # Gemini rejects a built-in tool next to other tools
+    assert all(callable(tool) for tool in agent.tools)
+    copy = cloudpickle.loads(cloudpickle.dumps(agent))
+    assert copy.tools[0]("return policy")["fallback"] is False
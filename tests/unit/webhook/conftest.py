@@ -0,0 +1,29 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Tests of the LINE webhook in deployment/terraform/cloud_run_function_chat.
+
+Its modules import each other by bare name, as they do when deployed, so the
+directory is put on sys.path. Module level stores use in-memory backends.
+"""
+
+import os
+import sys
+
+WEBHOOK_DIR = os.path.join(
+    os.path.dirname(__file__),
+    "..", "..", "..", "deployment", "terraform", "cloud_run_function_chat",
+)
+sys.path.insert(0, os.path.abspath(WEBHOOK_DIR))
+os.environ.setdefault("SESSION_STORE_BACKEND", "memory")
@@ -0,0 +1,62 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from answer_cache import AnswerCache, create_answer_cache, normalize_question
+
+
+def test_normalized_questions_share_an_answer() -> None:
+    """Case, punctuation and spacing do not matter, answers are per user."""
+    cache = AnswerCache()
+    cache.put("u1", "How can I receive my pay slip?", "From the HR portal.")
+
+    assert normalize_question("  how can i   receive my PAY slip ") == "how can i receive my pay slip"
+    assert cache.get("u1", "how can i receive my pay slip") == "From the HR portal."
+    assert cache.get("u2", "How can I receive my pay slip?") is None
+
+
+def test_short_follow_ups_are_never_cached() -> None:
+    """Answers to "yes" or "more detail" depend on the conversation."""
+    cache = AnswerCache(min_chars=12)
+    cache.put("u1", "yes", "Booked.")
+    cache.put("u1", "more detail", "Details...")
+
+    assert cache.get("u1", "yes") is None
+    assert cache.get("u1", "more detail") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_size_cap_evicts_least_recently_used() -> None:
+    """The total size stays within max_bytes, invalidate_user drops a user's answers."""
+    cache = AnswerCache(max_bytes=120, min_chars=1)
+    cache.put("u1", "first question", "a" * 40)
+    cache.put("u1", "second question", "b" * 40)
+    cache.put("u1", "third question", "c" * 40)
+
+    assert cache.get("u1", "first question") is None
+    assert cache.stats()["bytes"] <= 120
+
+    cache.invalidate_user("u1")
+    assert cache.stats()["entries"] == 0
+
+
+def test_cache_is_off_unless_configured(monkeypatch: pytest.MonkeyPatch) -> None:
+    """ANSWER_CACHE_SCOPE defaults to off."""
+    monkeypatch.delenv("ANSWER_CACHE_SCOPE", raising=False)
+    assert create_answer_cache() is None
+
+    monkeypatch.setenv("ANSWER_CACHE_SCOPE", "global")
+    cache = create_answer_cache()
+    cache.put("u1", "where is the office?", "Bangkok.")
+    assert cache.get("u2", "where is the office?") == "Bangkok."
@@ -0,0 +1,120 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+from engine_adapter import AgentEngineError, AsyncEngineAdapter
+from engine_cache import AgentEngineCache
+
+
+class _BlockingEngine:
+    def list_sessions(self, user_id: str) -> dict:
+        raise RuntimeError("404 engine not found")
+
+    def stream_query(self, **kwargs):
+        yield {"content": {"parts": [{"text": "hi"}]}}
+        raise RuntimeError("stream broke")
+
+
+def test_cache_miss_resolves_off_the_event_loop() -> None:
+    """get_async runs agent_engines.get on the executor and caches the handle."""
+    threads = []
+
+    def resolve(engine_id: str) -> str:
+        threads.append(threading.current_thread())
+        return f"handle-{engine_id}"
+
+    cache = AgentEngineCache(ttl_seconds=60)
+    with patch("engine_cache.agent_engines.get", side_effect=resolve):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+
+            async def main() -> list:
+                return [await cache.get_async("e1", executor) for _ in range(3)]
+
+            handles = asyncio.run(main())
+
+    assert handles == ["handle-e1"] * 3
+    assert len(threads) == 1 and threads[0] is not threading.main_thread()
+    assert cache.stats() == {"hits": 2, "misses": 1, "size": 1}
+
+
+def test_remote_failures_surface_as_agent_engine_error() -> None:
+    """Only failed engine calls raise AgentEngineError, so only they drop cached handles."""
+    adapter = AsyncEngineAdapter(_BlockingEngine())
+
+    async def main() -> list:
+        events = []
+        with pytest.raises(AgentEngineError):
+            await adapter.list_sessions(user_id="u1")
+        with pytest.raises(AgentEngineError, match="stream broke"):
+            async for event in adapter.stream_query(user_id="u1", message="q"):
+                events.append(event)
+        return events
+
+    assert asyncio.run(main()) == [{"content": {"parts": [{"text": "hi"}]}}]
+
+
+def test_concurrent_misses_share_one_lookup_and_keep_the_loop_running() -> None:
+    """Messages arriving during a slow lookup wait for it without freezing the loop."""
+    calls = []
+
+    def resolve(engine_id: str) -> str:
+        calls.append(engine_id)
+        time.sleep(0.5)
+        return f"handle-{engine_id}"
+
+    cache = AgentEngineCache(ttl_seconds=60)
+
+    async def main() -> tuple:
+        stalls = []
+
+        async def ticker() -> None:
+            last = time.perf_counter()
+            for _ in range(40):
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                stalls.append(now - last)
+                last = now
+
+        async def message(delay: float) -> str:
+            await asyncio.sleep(delay)
+            return await cache.get_async("e1", executor)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = await asyncio.gather(
+                *(message(i * 0.05) for i in range(5)), ticker()
+            )
+        return results[:5], max(stalls)
+
+    with patch("engine_cache.agent_engines.get", side_effect=resolve):
+        handles, longest_stall = asyncio.run(main())
+
+    assert handles == ["handle-e1"] * 5
+    assert calls == ["e1"]
+    assert longest_stall < 0.2
+    assert cache.stats() == {"hits": 0, "misses": 1, "size": 1}
+
+
+def test_failed_lookup_is_retried_by_the_next_miss() -> None:
+    """A lookup error reaches every waiter and is not cached."""
+    cache = AgentEngineCache(ttl_seconds=60)
+    with patch("engine_cache.agent_engines.get", side_effect=[RuntimeError("404"), "h"]):
+        with pytest.raises(RuntimeError):
+            cache.get("e1")
+        assert cache.get("e1") == "h"
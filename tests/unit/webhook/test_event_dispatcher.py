@@ -0,0 +1,76 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+from event_dispatcher import EventDispatcher
+
+
+def test_events_of_one_user_run_in_submission_order() -> None:
+    """A later, faster event of the same user waits for the earlier one."""
+    dispatcher = EventDispatcher()
+    log = []
+
+    async def handle(name: str, delay: float) -> None:
+        log.append(f"start {name}")
+        await asyncio.sleep(delay)
+        log.append(f"end {name}")
+
+    with dispatcher.batch():
+        dispatcher.submit("u1", lambda: handle("first", 0.05))
+        dispatcher.submit("u1", lambda: handle("second", 0))
+        dispatcher.submit("u1", lambda: handle("third", 0))
+
+    assert log == [
+        "start first", "end first",
+        "start second", "end second",
+        "start third", "end third",
+    ]
+    assert dispatcher._user_locks == {}
+
+
+def test_events_of_different_users_run_concurrently() -> None:
+    """Every user's event starts before any of them finishes."""
+    dispatcher = EventDispatcher()
+    started = []
+    seen_at_end = []
+
+    async def handle(user_id: str) -> None:
+        started.append(user_id)
+        await asyncio.sleep(0.05)
+        seen_at_end.append(len(started))
+
+    with dispatcher.batch():
+        for user_id in ("u1", "u2", "u3"):
+            dispatcher.submit(user_id, lambda user_id=user_id: handle(user_id))
+
+    assert seen_at_end == [3, 3, 3]
+
+
+def test_failing_event_does_not_block_the_next_one() -> None:
+    """Exceptions are logged and the user's following events still run."""
+    dispatcher = EventDispatcher()
+    handled = []
+
+    async def fail() -> None:
+        raise RuntimeError("boom")
+
+    async def handle() -> None:
+        handled.append(True)
+
+    with dispatcher.batch():
+        dispatcher.submit("u1", fail)
+        dispatcher.submit("u1", handle)
+
+    assert handled == [True]
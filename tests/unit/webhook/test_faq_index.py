@@ -0,0 +1,93 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+from faq_index import FaqIndex, create_faq_index
+
+FAQS = [
+    {"faq_question": "What is the return policy?", "faq_answer": "30 days."},
+    {"faq_question": "How do I track my order?", "faq_answer": "Orders page."},
+    {"faq_question": "Can I cancel my order?", "faq_answer": "Within 2 hours."},
+    {"faq_question": "Do you offer international shipping?", "faq_answer": "Yes."},
+]
+
+
+def _write(path: Path, faqs: list[dict]) -> None:
+    path.write_text("".join(json.dumps(faq) + "\n" for faq in faqs))
+
+
+def test_exact_question_matches_with_full_confidence(tmp_path: Path) -> None:
+    """The same wording scores 1.0, a reworded question matches with less."""
+    path = tmp_path / "faq.jsonl"
+    _write(path, FAQS)
+    index = FaqIndex(str(path))
+
+    exact = index.lookup("how do i track my order")
+    partial = index.lookup("track order status please")
+
+    assert exact.answer == "Orders page." and exact.confidence == 1.0
+    assert partial.answer == "Orders page." and partial.confidence < 0.8
+    assert index.lookup("completely unrelated words") is None
+
+
+def test_broken_reload_keeps_serving_the_previous_index(tmp_path: Path) -> None:
+    """A partial line or a deleted file is logged, lookups keep the last good FAQ."""
+    path = tmp_path / "faq.jsonl"
+    _write(path, FAQS)
+    index = FaqIndex(str(path), reload_check_seconds=0)
+    assert index.lookup("What is the return policy?").answer == "30 days."
+
+    with open(path, "a") as f:
+        f.write('{"faq_question": "half writ')
+    os.utime(path, (1, 1))
+    assert index.lookup("What is the return policy?").answer == "30 days."
+
+    os.remove(path)
+    assert index.lookup("What is the return policy?").answer == "30 days."
+
+    _write(path, [{"faq_question": "What is the return policy?", "faq_answer": "60 days."}])
+    assert index.lookup("What is the return policy?").answer == "60 days."
+
+
+def test_missing_file_answers_nothing(tmp_path: Path) -> None:
+    """An index whose file never loaded returns no match instead of raising."""
+    index = FaqIndex(str(tmp_path / "missing.jsonl"))
+    assert index.lookup("What is the return policy?") is None
+
+
+def test_question_missing_a_key_term_gets_no_confidence(tmp_path: Path) -> None:
+    """Underspecified questions do not get a canned answer meant for a narrower one."""
+    path = tmp_path / "faq.jsonl"
+    _write(path, FAQS)
+    index = FaqIndex(str(path))
+
+    assert index.lookup("What is the policy?").confidence == 0.0
+    assert index.lookup("Do you offer shipping?").confidence == 0.0
+    assert index.lookup("do you offer international shipping").confidence == 1.0
+
+
+def test_fast_path_is_off_by_default(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """FAQ_FASTPATH defaults to off, "on" indexes FAQ_PATH."""
+    path = tmp_path / "faq.jsonl"
+    _write(path, FAQS)
+    monkeypatch.setenv("FAQ_PATH", str(path))
+    monkeypatch.delenv("FAQ_FASTPATH", raising=False)
+    assert create_faq_index() is None
+
+    monkeypatch.setenv("FAQ_FASTPATH", "on")
+    assert create_faq_index() is not None
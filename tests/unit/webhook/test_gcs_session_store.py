@@ -0,0 +1,143 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import itertools
+import json
+from collections.abc import Callable
+
+import gcs_session_store
+import pytest
+from gcs_session_store import WriteBehindSessionStore
+from google.api_core import exceptions
+
+
+class _FakeBucket:
+    """Objects with generations and if_generation_match, like GCS."""
+
+    def __init__(self) -> None:
+        self.objects: dict[str, tuple[str, int]] = {}
+        self.generations = itertools.count(1)
+        # called before an upload is checked, to simulate concurrent writers
+        self.before_upload: Callable[[str], None] | None = None
+
+    def blob(self, name: str) -> "_FakeBlob":
+        return _FakeBlob(self, name)
+
+    def set(self, name: str, data: dict) -> None:
+        self.objects[name] = (json.dumps(data), next(self.generations))
+
+    def count(self, name: str) -> int:
+        return json.loads(self.objects[name][0])["session_count"]
+
+
+class _FakeBlob:
+    def __init__(self, bucket: _FakeBucket, name: str) -> None:
+        self.bucket = bucket
+        self.name = name
+        self.generation: int | None = None
+
+    def download_as_text(self) -> str:
+        if self.name not in self.bucket.objects:
+            raise exceptions.NotFound(self.name)
+        text, self.generation = self.bucket.objects[self.name]
+        return text
+
+    def upload_from_string(
+        self, data: str, content_type: str, if_generation_match: int
+    ) -> None:
+        if self.bucket.before_upload is not None:
+            self.bucket.before_upload(self.name)
+        current = self.bucket.objects.get(self.name, (None, 0))[1]
+        if current != if_generation_match:
+            raise exceptions.PreconditionFailed(self.name)
+        self.generation = next(self.bucket.generations)
+        self.bucket.objects[self.name] = (data, self.generation)
+
+
+@pytest.fixture
+def bucket(monkeypatch: pytest.MonkeyPatch) -> _FakeBucket:
+    bucket = _FakeBucket()
+    monkeypatch.setattr(gcs_session_store, "get_bucket", lambda name: bucket)
+    return bucket
+
+
+def _store() -> WriteBehindSessionStore:
+    # flushed explicitly by the tests
+    return WriteBehindSessionStore("bucket", "sessions", flush_interval_seconds=3600)
+
+
+def test_increments_are_merged_with_a_concurrent_writer(bucket: _FakeBucket) -> None:
+    """On a generation conflict the local increments are re-applied on the remote value."""
+    bucket.set("sessions/u1.json", {"user_id": "u1", "session_count": 10})
+    store = _store()
+    asyncio.run(store.incr("u1", 3))
+    # another instance writes after this one loaded the session
+    bucket.set("sessions/u1.json", {"user_id": "u1", "session_count": 15})
+
+    store.flush()
+
+    assert bucket.count("sessions/u1.json") == 18
+    assert asyncio.run(store.get("u1"))["session_count"] == 18
+
+
+def test_put_overwrites_a_concurrent_writer(bucket: _FakeBucket) -> None:
+    """A put replaces the session, the remote count is not merged into it."""
+    bucket.set("sessions/u1.json", {"user_id": "u1", "session_count": 10})
+    store = _store()
+    asyncio.run(store.put("u1", {"user_id": "u1", "session_count": 0}))
+    bucket.set("sessions/u1.json", {"user_id": "u1", "session_count": 15})
+
+    store.flush()
+
+    assert bucket.count("sessions/u1.json") == 0
+
+
+def test_failed_flush_keeps_the_increments_for_the_next_one(bucket: _FakeBucket) -> None:
+    """Increments of a failed upload are written by the following flush."""
+    store = _store()
+    asyncio.run(store.incr("u1", 2))
+
+    def fail(name: str) -> None:
+        raise exceptions.ServiceUnavailable("try again")
+
+    bucket.before_upload = fail
+    store.flush()
+    assert "sessions/u1.json" not in bucket.objects
+
+    bucket.before_upload = None
+    asyncio.run(store.incr("u1", 1))
+    store.flush()
+
+    assert bucket.count("sessions/u1.json") == 3
+
+
+def test_increments_during_an_upload_stay_on_top(bucket: _FakeBucket) -> None:
+    """An incr racing with the upload of a merged value is kept and written next."""
+    bucket.set("sessions/u1.json", {"user_id": "u1", "session_count": 10})
+    store = _store()
+    asyncio.run(store.incr("u1", 1))
+    bucket.set("sessions/u1.json", {"user_id": "u1", "session_count": 20})
+
+    def incr_once(name: str) -> None:
+        bucket.before_upload = None
+        asyncio.run(store.incr("u1", 5))
+
+    bucket.before_upload = incr_once
+    store.flush()
+    assert bucket.count("sessions/u1.json") == 21
+    assert asyncio.run(store.get("u1"))["session_count"] == 26
+
+    store.flush()
+    assert bucket.count("sessions/u1.json") == 26
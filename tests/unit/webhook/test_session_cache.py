@@ -0,0 +1,67 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from session_cache import SessionIdCache
+
+
+def test_least_recently_used_user_is_evicted() -> None:
+    """Reading an entry refreshes it, the oldest untouched one goes first."""
+    cache = SessionIdCache(max_entries=2)
+    cache.put("u1", "s1", 1.0)
+    cache.put("u2", "s2", 2.0)
+    assert cache.get("u1") == ("s1", 1.0)
+
+    cache.put("u3", "s3", 3.0)
+
+    assert cache.get("u2") is None
+    assert cache.get("u1") == ("s1", 1.0)
+    assert len(cache) == 2
+
+
+def test_put_session_touch_and_invalidate() -> None:
+    """Session dicts of either key style are stored, touch bumps the update time."""
+    cache = SessionIdCache()
+    cache.put_session("u1", {"id": "s1", "lastUpdateTime": 10.0})
+    cache.put_session("u2", {"id": "s2", "last_update_time": 20.0})
+    assert cache.get("u1") == ("s1", 10.0)
+    assert cache.get("u2") == ("s2", 20.0)
+
+    cache.touch("u1")
+    assert cache.get("u1")[1] > 10.0
+
+    cache.invalidate("u1")
+    assert cache.get("u1") is None
+
+
+def test_get_session_lists_sessions_only_on_a_miss(monkeypatch) -> None:
+    """The second message of a user is served from the cache."""
+    import session_handler
+
+    monkeypatch.setattr(session_handler, "SESSION_CACHE", SessionIdCache())
+    remote_app = MagicMock()
+    remote_app.list_sessions = AsyncMock(
+        return_value={"sessions": [{"id": "old", "lastUpdateTime": 1.0},
+                                   {"id": "s1", "lastUpdateTime": 2.0}]}
+    )
+    ctx = MagicMock(remote_app=remote_app, user_id="u1")
+    handler = session_handler.SessionHandler()
+
+    first = asyncio.run(handler.get_session(ctx))
+    second = asyncio.run(handler.get_session(ctx))
+
+    assert first == second == ("s1", 2.0)
+    remote_app.list_sessions.assert_awaited_once_with(user_id="u1")
@@ -0,0 +1,129 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import session_handler
+from answer_cache import AnswerCache
+from faq_index import FaqMatch
+from session_cache import SessionIdCache
+from session_handler import MAX_REPLY_MESSAGES, MAX_TEXT_LENGTH, split_reply
+
+LONG_ANSWER = " ".join(["word"] * 3000)
+
+
+class _FakeApiClient:
+    def __init__(self, configuration: object) -> None:
+        pass
+
+    async def __aenter__(self) -> "_FakeApiClient":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        pass
+
+
+class _FakeEngine:
+    def __init__(self, texts: list[str]) -> None:
+        self.texts = texts
+        self.queries = 0
+
+    async def list_sessions(self, user_id: str) -> dict:
+        return {"sessions": [{"id": "s1", "lastUpdateTime": 4_000_000_000.0}]}
+
+    async def stream_query(self, **kwargs):
+        self.queries += 1
+        for text in self.texts:
+            yield {"content": {"parts": [{"text": text}]}}
+
+
+@pytest.fixture
+def replies(monkeypatch: pytest.MonkeyPatch) -> list:
+    sent: list = []
+
+    class _FakeMessagingApi:
+        def __init__(self, api_client: object) -> None:
+            pass
+
+        async def reply_message(self, request: object) -> None:
+            sent.append(request)
+
+    monkeypatch.setattr(session_handler, "AsyncApiClient", _FakeApiClient)
+    monkeypatch.setattr(session_handler, "AsyncMessagingApi", _FakeMessagingApi)
+    monkeypatch.setattr(session_handler, "SESSION_CACHE", SessionIdCache())
+    monkeypatch.setattr(session_handler, "ANSWER_CACHE", None)
+    monkeypatch.setattr(session_handler, "FAQ_INDEX", None)
+    return sent
+
+
+def _context(question: str, engine: _FakeEngine) -> session_handler.MessageContext:
+    event = MagicMock(reply_token="token")
+    event.message.text = question
+    state = MagicMock(session_count=0)
+    state.increment_session = AsyncMock()
+    return session_handler.MessageContext(
+        event=event, remote_app=engine, session_state=state, user_id="u1"
+    )
+
+
+def _handle(ctx: session_handler.MessageContext) -> None:
+    asyncio.run(session_handler.SessionHandler()._handle_message(ctx, MagicMock()))
+
+
+def test_split_reply_respects_the_line_limits() -> None:
+    """Texts are cut at a space, at most 5 of 5000 characters, the rest is dropped."""
+    parts = split_reply(LONG_ANSWER)
+    assert len(parts) == 3
+    assert all(len(part) <= MAX_TEXT_LENGTH for part in parts)
+    assert " ".join(parts) == LONG_ANSWER
+
+    parts = split_reply("x" * MAX_TEXT_LENGTH * 7)
+    assert len(parts) == MAX_REPLY_MESSAGES
+    assert all(len(part) == MAX_TEXT_LENGTH for part in parts)
+    assert parts[-1].endswith("…")
+    assert split_reply("") == []
+
+
+def test_streamed_answer_is_sent_as_one_reply(replies: list) -> None:
+    """All streamed parts go out with the single reply token, one turn is counted."""
+    ctx = _context("What is the leave policy?", _FakeEngine(["Part one.", " ", "Part two."]))
+    _handle(ctx)
+
+    assert len(replies) == 1
+    assert [m.text for m in replies[0].messages] == ["Part one.\nPart two."]
+    ctx.session_state.increment_session.assert_awaited_once()
+
+
+def test_cached_and_faq_answers_are_split(
+    replies: list, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Long answers served without the agent respect the LINE limits as well."""
+    cache = AnswerCache()
+    cache.put("u1", "What is the leave policy?", LONG_ANSWER)
+    faq = MagicMock()
+    faq.lookup.return_value = FaqMatch("How do I apply?", LONG_ANSWER, 1.0, 1.0)
+    monkeypatch.setattr(session_handler, "ANSWER_CACHE", cache)
+    monkeypatch.setattr(session_handler, "FAQ_INDEX", faq)
+    engine = _FakeEngine(["unused"])
+
+    _handle(_context("What is the leave policy?", engine))
+    _handle(_context("How do I apply for leave?", engine))
+
+    assert engine.queries == 0
+    assert len(replies) == 2
+    for reply in replies:
+        assert len(reply.messages) == 3
+        assert all(len(m.text) <= MAX_TEXT_LENGTH for m in reply.messages)
@@ -0,0 +1,103 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import session_handler
+from session_cache import SessionIdCache
+from session_reaper import SessionReaper
+
+
+class _FakeEngine:
+    def __init__(self, fail_delete: bool = False) -> None:
+        self.fail_delete = fail_delete
+        self.release_delete = asyncio.Event()
+        self.sessions: dict[str, list[dict]] = {}
+        self.created = 0
+
+    async def create_session(self, user_id: str) -> dict:
+        self.created += 1
+        session = {"id": f"s{self.created}", "lastUpdateTime": 1000.0 + self.created}
+        self.sessions.setdefault(user_id, []).append(session)
+        return session
+
+    async def list_sessions(self, user_id: str) -> dict:
+        return {"sessions": list(self.sessions.get(user_id, []))}
+
+    async def delete_session(self, session_id: str, user_id: str) -> None:
+        await self.release_delete.wait()
+        if self.fail_delete:
+            raise RuntimeError("503 unavailable")
+        self.sessions[user_id] = [s for s in self.sessions[user_id] if s["id"] != session_id]
+
+
+@pytest.fixture
+def handler(monkeypatch: pytest.MonkeyPatch) -> session_handler.SessionHandler:
+    monkeypatch.setattr(session_handler, "SESSION_CACHE", SessionIdCache())
+    monkeypatch.setattr(session_handler, "SESSION_REAPER", SessionReaper())
+    monkeypatch.setattr(session_handler, "ANSWER_CACHE", None)
+    return session_handler.SessionHandler()
+
+
+def _context(engine: _FakeEngine) -> session_handler.MessageContext:
+    state = MagicMock(session_count=7)
+    state.save_session = AsyncMock()
+    return session_handler.MessageContext(
+        event=MagicMock(), remote_app=engine, session_state=state, user_id="u1"
+    )
+
+
+def test_restart_does_not_wait_for_the_delete(handler: session_handler.SessionHandler) -> None:
+    """The new session is used at once, the old one is deleted in the background."""
+
+    async def main() -> None:
+        engine = _FakeEngine()
+        ctx = _context(engine)
+        old_id, _ = await handler.get_session(ctx)
+
+        new_id = await handler.restart_session(ctx, old_id)
+
+        assert new_id != old_id
+        assert session_handler.SESSION_REAPER.stats()["pending"] == 1
+        assert await handler.get_session(ctx) == (new_id, 1002.0)
+        engine.release_delete.set()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert [s["id"] for s in engine.sessions["u1"]] == [new_id]
+        assert session_handler.SESSION_REAPER.stats() == {"pending": 0, "deleted": 1, "failed": 0}
+        # no sessions are created ahead of time
+        assert engine.created == 2
+
+    asyncio.run(main())
+
+
+def test_undeleted_session_is_not_picked_again(handler: session_handler.SessionHandler) -> None:
+    """After a failed delete, a cold instance still lists the newer session last."""
+
+    async def main() -> None:
+        engine = _FakeEngine(fail_delete=True)
+        engine.release_delete.set()
+        ctx = _context(engine)
+        old_id, _ = await handler.get_session(ctx)
+        new_id = await handler.restart_session(ctx, old_id)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+        assert session_handler.SESSION_REAPER.stats()["failed"] == 1
+        session_handler.SESSION_CACHE.invalidate("u1")
+        assert (await handler.get_session(ctx))[0] == new_id
+
+    asyncio.run(main())
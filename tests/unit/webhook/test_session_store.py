@@ -0,0 +1,114 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import sqlite3
+import time
+from pathlib import Path
+
+import pytest
+from session_store import (
+    MemorySessionStore,
+    SessionStore,
+    SqliteSessionStore,
+    create_session_store,
+)
+
+
+async def _get_incr_put(store: SessionStore) -> None:
+    assert await store.get("u1") == {"user_id": "u1", "session_count": 0}
+    assert await store.incr("u1") == 1
+    assert await store.incr("u1", 2) == 3
+    await store.put("u2", {"user_id": "u2", "session_count": 7})
+    assert await store.get("u2") == {"user_id": "u2", "session_count": 7}
+    assert (await store.get("u1"))["session_count"] == 3
+
+
+def test_memory_store_get_incr_put() -> None:
+    """Unknown users start at 0, incr adds, put replaces."""
+    asyncio.run(_get_incr_put(MemorySessionStore()))
+
+
+def test_memory_store_evicts_least_recently_used() -> None:
+    """Beyond max_entries the user not seen for longest is forgotten."""
+
+    async def main() -> None:
+        store = MemorySessionStore(max_entries=2)
+        await store.incr("u1")
+        await store.incr("u2")
+        await store.get("u1")
+        await store.incr("u3")
+        assert (await store.get("u1"))["session_count"] == 1
+        assert (await store.get("u2"))["session_count"] == 0
+
+    asyncio.run(main())
+
+
+def test_sqlite_store_persists_across_connections(tmp_path: Path) -> None:
+    """A second store on the same file sees the counts written by the first."""
+    path = str(tmp_path / "sessions.db")
+
+    async def main() -> None:
+        first = SqliteSessionStore(path)
+        await _get_incr_put(first)
+        second = SqliteSessionStore(path)
+        assert await second.incr("u1") == 4
+        assert (await first.get("u1"))["session_count"] == 4
+        first.close()
+        second.close()
+
+    asyncio.run(main())
+
+
+def test_sqlite_lock_wait_does_not_stall_the_loop(tmp_path: Path) -> None:
+    """While another process holds the write lock, incr waits on a thread."""
+    path = str(tmp_path / "sessions.db")
+    store = SqliteSessionStore(path)
+    other = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    other.execute("BEGIN IMMEDIATE")
+
+    async def main() -> tuple:
+        ticks = 0
+
+        async def ticker() -> None:
+            nonlocal ticks
+            deadline = time.perf_counter() + 0.3
+            while time.perf_counter() < deadline:
+                await asyncio.sleep(0.01)
+                ticks += 1
+            other.execute("COMMIT")
+
+        count, _ = await asyncio.gather(store.incr("u1"), ticker())
+        return count, ticks
+
+    count, ticks = asyncio.run(main())
+    assert count == 1
+    assert ticks > 10
+    other.close()
+    store.close()
+
+
+def test_factory_builds_the_named_backend(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """memory and sqlite are built locally, unknown names raise ValueError."""
+    monkeypatch.setenv("SESSION_STORE_SQLITE_PATH", str(tmp_path / "sessions.db"))
+    assert isinstance(create_session_store("memory"), MemorySessionStore)
+    store = create_session_store("SQLite")
+    assert isinstance(store, SqliteSessionStore)
+    store.close()
+
+    monkeypatch.setenv("SESSION_STORE_BACKEND", "redis")
+    with pytest.raises(ValueError, match="redis"):
+        create_session_store()